@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from src.config import CACHE_DB_PATH, MEMORY_CACHE_SIZE
+from src.utils import get_cache_path, SubtitleEvent
+
+logger = logging.getLogger(__name__)
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def _load_events(parsed_json: str) -> list[SubtitleEvent]:
+    # Stored as [start, end, text] rows
+    return [SubtitleEvent(*e) for e in json.loads(parsed_json)]
+
+def video_fingerprint(video_file: str, sample_bytes: int = 1 << 20) -> str:
+    """
+    Cheap content identity for a video: the first MiB plus the file size. Survives
+    renames, moves and touches without ever reading the whole file.
+    """
+    with open(video_file, 'rb') as f:
+        head = f.read(sample_bytes)
+    return hashlib.blake2b(head + str(os.path.getsize(video_file)).encode(), digest_size=16).hexdigest()
+
+class TranscriptionCache:
+    """
+    Single-file sqlite store for raw Gemini transcriptions of one video, together with
+    their parsed events (timestamps relative to the chunk start).
+
+    Entries are keyed by the video's content fingerprint (computed once per job), chunk
+    bounds and model. Transcriptions left in the old per-chunk .txt cache are imported on
+    first read.
+    """
+    def __init__(self, video_file: str, model: str, db_path: Path = CACHE_DB_PATH, memory_size: int = MEMORY_CACHE_SIZE) -> None:
+        self.video_file = video_file
+        self.model = model
+        self.fingerprint = video_fingerprint(video_file)
+
+        self._conn = _connect(db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS transcriptions (key TEXT PRIMARY KEY, raw TEXT NOT NULL, parsed TEXT)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        # Recently read/written entries, so repeat lookups within a run skip sqlite
+        self._memory: OrderedDict[str, tuple[str, list[SubtitleEvent] | None]] = OrderedDict()
+        self._memory_size = memory_size
+
+    def _remember(self, key: str, entry: tuple[str, list[SubtitleEvent] | None]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def _key(self, start_ms: float | int, end_ms: float | int) -> str:
+        return hashlib.blake2b(f"{self.fingerprint}|{start_ms}|{end_ms}|{self.model}".encode(), digest_size=16).hexdigest()
+
+    def get(self, start_ms: float | int, end_ms: float | int) -> tuple[str, list[SubtitleEvent] | None] | None:
+        """
+        Returns (raw_text, parsed_events) for a chunk, where parsed_events is None if the
+        entry was stored without them, or None on a cache miss.
+        """
+        key = self._key(start_ms, end_ms)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            row = self._conn.execute("SELECT raw, parsed FROM transcriptions WHERE key=?", (key,)).fetchone()
+            if row:
+                entry = (row[0], _load_events(row[1]) if row[1] is not None else None)
+                self._remember(key, entry)
+                return entry
+
+        legacy_path = Path(get_cache_path(self.video_file, start_ms, end_ms))
+        if legacy_path.exists():
+            raw_text = legacy_path.read_text(encoding='utf-8')
+            logger.debug("Imported legacy cache file: %s", legacy_path)
+            self.put(start_ms, end_ms, raw_text)
+            return raw_text, None
+        return None
+
+    def has(self, start_ms: float | int, end_ms: float | int) -> bool:
+        """
+        Cheap existence check (no payload is read), used to plan which chunks need audio.
+        """
+        key = self._key(start_ms, end_ms)
+        with self._lock:
+            row = key in self._memory or self._conn.execute("SELECT 1 FROM transcriptions WHERE key=?", (key,)).fetchone()
+        if row:
+            return True
+        return os.path.exists(get_cache_path(self.video_file, start_ms, end_ms))
+
+    def put(self, start_ms: float | int, end_ms: float | int, raw_text: str, parsed: list[SubtitleEvent] | None = None) -> None:
+        key = self._key(start_ms, end_ms)
+        parsed_json = json.dumps(parsed, ensure_ascii=False) if parsed is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, raw, parsed) VALUES (?, ?, ?)",
+                (key, raw_text, parsed_json)
+            )
+            self._conn.commit()
+            self._remember(key, (raw_text, parsed))
+
+    def delete(self, start_ms: float | int, end_ms: float | int) -> None:
+        key = self._key(start_ms, end_ms)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute("DELETE FROM transcriptions WHERE key=?", (key,))
+            self._conn.commit()
+        legacy_path = get_cache_path(self.video_file, start_ms, end_ms)
+        if os.path.exists(legacy_path): os.remove(legacy_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class ProbeCache:
+    """
+    Persists ffprobe stream listings across runs, keyed by the caller (path, mtime, size),
+    so re-processing an unchanged video skips the ffprobe subprocess.
+    """
+    def __init__(self, db_path: Path = CACHE_DB_PATH) -> None:
+        self._conn = _connect(db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS probes (key TEXT PRIMARY KEY, streams TEXT NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list[dict] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT streams FROM probes WHERE key=?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, streams: list[dict]) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO probes (key, streams) VALUES (?, ?)", (key, json.dumps(streams)))
+            self._conn.commit()
+
+class ContextCache:
+    """
+    Persists Wikipedia fetches and their Gemini summaries across runs, so regenerating
+    context for the same series skips both the HTTP round-trips and the model call.
+    """
+    def __init__(self, db_path: Path = CACHE_DB_PATH) -> None:
+        self._conn = _connect(db_path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS context (key TEXT PRIMARY KEY, content TEXT NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM context WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, content: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO context (key, content) VALUES (?, ?)", (key, content))
+            self._conn.commit()
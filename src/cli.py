@@ -4,7 +4,7 @@ from pathlib import Path
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Prompt
-from src.config import PROJECT_ROOT, API_KEY, DEFAULT_MODEL
+from src.config import PROJECT_ROOT, API_KEY, DEFAULT_MODEL, MAX_CONCURRENCY
 from src.core import process_video
 from src.context_generator import ContextGenerator, get_wiki_content
 import logging
@@ -72,6 +72,7 @@ def run(
     model: str = typer.Option(DEFAULT_MODEL, "--model", help="Gemini model to use"),
     chunk_size: int = typer.Option(90, "--chunk-size", help="Target duration for audio chunks in seconds"),
     limit: int = typer.Option(None, "--limit", help="Limit processing to N chunks (for testing)"),
+    workers: int = typer.Option(MAX_CONCURRENCY, "--workers", "-w", min=1, help="Maximum number of chunks transcribed in parallel"),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging"),
     keep_temp: bool = typer.Option(False, "--keep-temp", help="Keep temporary files after processing"),
 ):
@@ -89,6 +90,7 @@ def run(
         chunk_size=chunk_size,
         context_path=str(context) if context else None,
         limit=limit,
+        workers=workers,
         verbose=verbose,
         keep_temp=keep_temp
     )
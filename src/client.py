@@ -0,0 +1,14 @@
+from functools import lru_cache
+from src.config import API_KEY, REQUEST_TIMEOUT_MS
+
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    Process-wide Gemini client, shared by transcription and context generation so every
+    request reuses the same pooled HTTP connections. The SDK is imported lazily, so
+    commands that fail early (missing tracks, bad input) never pay its import cost.
+    """
+    from google import genai
+    from google.genai import types
+    # The client-wide timeout also bounds file uploads, which have no per-call timeout
+    return genai.Client(api_key=API_KEY, http_options=types.HttpOptions(timeout=REQUEST_TIMEOUT_MS))
@@ -8,15 +8,51 @@ load_dotenv(PROJECT_ROOT / ".env")
 API_KEY = os.getenv("GOOGLE_API_KEY")
 DEFAULT_MODEL = "gemini-2.5-flash"
 CACHE_DIR = PROJECT_ROOT / "cache"
+CACHE_DB_PATH = CACHE_DIR / "transcriptions.db"
+MEMORY_CACHE_SIZE = 512
 
 # Media Processing Constants
 CHUNK_TARGET_SECONDS = 90
 MAX_GAP_SECONDS = 2.0
 AUDIO_PADDING_MS = 700
+# Chunk encoding: speech-only mono AAC keeps request payloads small
+AUDIO_CHANNELS = 1
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_BITRATE = "32k"
+# Rough token ceiling for a chunk's English context; denser clusters are split
+CONTEXT_TOKEN_BUDGET = 4000
+# Subtitle lines shorter than this skip the English-ratio check when they are plain ASCII
+SHORT_TEXT_CHARS = 4
 
 # API Constants
-POLLING_INTERVAL_SECONDS = 2
+POLLING_INITIAL_SECONDS = 0.5
+POLLING_MAX_SECONDS = 8.0
+# Give up on an uploaded file that is still processing after this long
+POLLING_TIMEOUT_SECONDS = 300
+# Gemini caps inline request payloads at 20 MB; larger audio goes through the Files API
+INLINE_AUDIO_MAX_BYTES = 20_000_000
 MAX_RETRIES = 3
+API_MAX_RETRIES = 3
+REQUEST_TIMEOUT_MS = 120_000
+# ~90 s of speech is well under 1k tokens; the rest is headroom for the model's thinking tokens
+MAX_OUTPUT_TOKENS = 8192
+TEMPERATURE = 0.2
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_JITTER_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 64.0
+RPM_LIMIT = 10
+TPM_LIMIT = 250_000
+# Gemini bills audio at ~32 tokens/s, so a 90 s chunk is roughly 3k tokens
+AUDIO_TOKEN_ESTIMATE = 3000
+
+# Concurrency Constants
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8
+AIMD_INCREASE = 0.5
+AIMD_DECREASE = 0.5
+AIMD_LATENCY_WINDOW = 10
+AIMD_WARMUP_SAMPLES = 5
+AIMD_LATENCY_TOLERANCE = 2.0
 
 # Validation Constants
 CPS_THRESHOLD_MAX = 25.0
@@ -1,48 +1,97 @@
-import wikipedia
+import sqlite3
 import logging
-from google import genai
-from google.genai import types
+from functools import lru_cache
 from src.config import API_KEY, DEFAULT_MODEL
+from src.cache import ContextCache
+from src.client import get_client
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
+def _shared_cache() -> ContextCache:
+    # One connection per process, reused by every lookup and store
+    return ContextCache()
+
+def _open_cache() -> ContextCache | None:
+    try:
+        return _shared_cache()
+    except sqlite3.Error as e:
+        logger.warning("Context cache unavailable: %s", e)
+        return None
+
+def _lookup(cache: ContextCache | None, key: str) -> str | None:
+    try:
+        return cache.get(key) if cache else None
+    except sqlite3.Error as e:
+        logger.warning("Failed to read context cache: %s", e)
+        return None
+
+def _store(cache: ContextCache | None, key: str, content: str) -> str:
+    if cache and content:
+        try:
+            cache.put(key, content)
+        except sqlite3.Error as e:
+            logger.warning("Failed to cache context: %s", e)
+    return content
+
 def get_wiki_content(query: str, lang: str = "ja") -> str:
     """
-    Fetches the content of a Wikipedia page.
+    Fetches the content of a Wikipedia page, reusing the copy cached by a previous run.
     """
+    cache = _open_cache()
+    key = ContextCache.key("wiki", lang, query)
+    cached = _lookup(cache, key)
+    if cached is not None:
+        logger.info("Using cached Wikipedia content for '%s'", query)
+        return cached
+
+    import wikipedia
     wikipedia.set_lang(lang)
     try:
         # Use auto_suggest=False to get more precise results for anime titles
         page = wikipedia.page(query, auto_suggest=False)
-        return page.content
+        return _store(cache, key, page.content)
     except wikipedia.exceptions.DisambiguationError as e:
-        logger.warning(f"Disambiguation error for '{query}': {e.options}")
+        logger.warning("Disambiguation error for '%s': %s", query, e.options)
         # Try to get the first option if it's not a list of suggestions
         if e.options:
             try:
                 page = wikipedia.page(e.options[0], auto_suggest=False)
-                return page.content
+                return _store(cache, key, page.content)
             except Exception:
                 raise ValueError(f"Ambiguous search result for '{query}'. Options: {', '.join(e.options[:5])}")
         raise ValueError(f"Ambiguous search result for '{query}'.")
     except wikipedia.exceptions.PageError:
-        logger.error(f"Page not found for topic: {query}")
+        logger.error("Page not found for topic: %s", query)
         raise ValueError(f"Wikipedia page not found for '{query}' in language '{lang}'.")
     except Exception as e:
-        logger.error(f"Unexpected error fetching Wikipedia content: {e}")
+        logger.error("Unexpected error fetching Wikipedia content: %s", e)
         raise
 
 class ContextGenerator:
     def __init__(self, model_name: str = DEFAULT_MODEL) -> None:
         if not API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-        self.client = genai.Client(api_key=API_KEY)
         self.model_name = model_name
 
+    @property
+    def client(self):
+        return get_client()
+
     def generate_summary(self, raw_text: str, query: str) -> str:
         """
-        Uses Gemini to summarize Wikipedia content into a markdown reference.
+        Uses Gemini to summarize Wikipedia content into a markdown reference. Summaries are
+        cached per (model, query, content), so re-running on unchanged content is free.
         """
+        from google.genai import types
+
+        cache = _open_cache()
+        key = ContextCache.key("summary", self.model_name, query, raw_text)
+        cached = _lookup(cache, key)
+        if cached is not None:
+            logger.info("Using cached summary for '%s'", query)
+            return cached
+
         prompt = (
             f"以下は、'{query}' に関するWikipediaの生データです。\n\n"
             "このテキストを分析し、文字起こしAIのための「超」簡潔なリファレンスを作成してください。\n"
@@ -71,7 +120,7 @@ class ContextGenerator:
                     system_instruction="あなたはデータ整理のプロです。余計な言葉を一切省き、構造化されたデータのみを出力してください。",
                 )
             )
-            return response.text or ""
+            return _store(cache, key, response.text or "")
         except Exception as e:
-            logger.error(f"Error generating summary with Gemini: {e}")
+            logger.error("Error generating summary with Gemini: %s", e)
             raise
@@ -1,23 +1,27 @@
 import os
 import shutil
+import threading
 import logging
 import tempfile
-from datetime import timedelta
+from typing import TextIO
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn
 from rich.panel import Panel
 from rich.console import Console
 
-from src.config import DEFAULT_MODEL, CACHE_DIR, CHUNK_TARGET_SECONDS, AUDIO_PADDING_MS, MAX_RETRIES
+from src.config import DEFAULT_MODEL, CHUNK_TARGET_SECONDS, AUDIO_PADDING_MS, MAX_RETRIES, MAX_CONCURRENCY
 from src.logger import setup_logging
-from src.utils import get_cache_path, ms_to_mm_ss_mmm, parse_timestamps, ms_to_srt_time, validate_chunk, SubtitleEvent
-from src.media_utils import MediaProcessor, get_dialogue_from_ass, group_events
+from src.utils import load_series_context, ms_to_mm_ss_mmm, parse_timestamps, ms_to_srt_time, validate_chunk, SubtitleEvent
+from src.media_utils import MediaProcessor, AudioChunks, get_dialogue_from_ass_text, group_events, split_if_oversize
 from src.transcriber import Transcriber, RateLimitError
+from src.throttle import AIMDController
+from src.cache import TranscriptionCache
 
 logger = logging.getLogger(__name__)
 console = Console()
 
 class SubtitleJob:
-    def __init__(self, video_file: str, output_path: str | None = None, model: str = DEFAULT_MODEL, chunk_size: int = CHUNK_TARGET_SECONDS, context_path: str | None = None, limit: int | None = None, keep_temp: bool = False, verbose: bool = False):
+    def __init__(self, video_file: str, output_path: str | None = None, model: str = DEFAULT_MODEL, chunk_size: int = CHUNK_TARGET_SECONDS, context_path: str | None = None, limit: int | None = None, keep_temp: bool = False, verbose: bool = False, workers: int = MAX_CONCURRENCY):
         self.video_file = video_file
         self.output_path = output_path or self._default_output_path()
         self.model = model
@@ -26,45 +30,70 @@ class SubtitleJob:
         self.limit = limit
         self.keep_temp = keep_temp
         self.verbose = verbose
+        self.workers = max(1, workers)
         
         self.temp_dir = tempfile.mkdtemp(prefix="jimakugen_")
         self.media = MediaProcessor()
         self.transcriber = Transcriber()
-        self.series_context = self._load_context()
+        self.concurrency = AIMDController(max_limit=self.workers)
+        self.cache: TranscriptionCache | None = None
+        self.audio_chunks: AudioChunks | None = None
+        self.audio_slots: dict[int, int] = {}
+        self.audio_index: int | str | None = None
+        self.audio_codec: str | None = None
+        self.audio_channels: int | None = None
+        self.series_context = load_series_context(self.context_path)
         
-        self.final_subs: list[SubtitleEvent] = []
-        self.stop_requested = False
+        self.srt_file: TextIO | None = None
+        self.subs_written = 0
+        self.output_failed = False
+        # Shared by every worker thread
+        self.stop_event = threading.Event()
+
+    @property
+    def stop_requested(self) -> bool:
+        return self.stop_event.is_set()
+
+    @stop_requested.setter
+    def stop_requested(self, value: bool) -> None:
+        if value:
+            self.stop_event.set()
+        else:
+            self.stop_event.clear()
 
     def _default_output_path(self) -> str:
         base, _ = os.path.splitext(self.video_file)
         return f"{base}.ja.srt"
 
-    def _load_context(self) -> str | None:
-        if not self.context_path:
-            return None
-        try:
-            with open(self.context_path, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        except Exception as e:
-            logger.error(f"Failed to read context file: {e}")
-            return None
-
     def cleanup(self):
+        self._close_srt()
+        if self.audio_chunks:
+            self.audio_chunks.close()
+        if self.cache:
+            self.cache.close()
         if self.keep_temp:
-            logger.info(f"Temporary directory kept at: {self.temp_dir}")
+            logger.info("Temporary directory kept at: %s", self.temp_dir)
         else:
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
-            logger.debug(f"Cleaned up temporary directory: {self.temp_dir}")
+            # The temp dir is flat, so a single scandir pass removes it; anything
+            # unexpected (e.g. a subdirectory) falls back to rmtree.
+            try:
+                with os.scandir(self.temp_dir) as entries:
+                    for entry in entries:
+                        os.unlink(entry.path)
+                os.rmdir(self.temp_dir)
+            except OSError:
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+            logger.debug("Cleaned up temporary directory: %s", self.temp_dir)
 
     def run(self):
         try:
-            os.makedirs(CACHE_DIR, exist_ok=True)
-            
             if not self.media.is_valid_media(self.video_file):
-                logger.error(f"Invalid media file: {self.video_file}")
+                logger.error("Invalid media file: %s", self.video_file)
                 console.print(f"[bold red]Error:[/bold red] '{self.video_file}' is not a valid media file or cannot be read.")
                 return
 
+            self.cache = TranscriptionCache(self.video_file, self.model)
+
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
@@ -92,25 +121,33 @@ class SubtitleJob:
 
                 audio_index = best_audio['index']
                 
+                # The Gemini SDK import is slow and independent of ffmpeg, so it runs in the
+                # background while the subtitles are extracted and grouped.
+                warm_up = ThreadPoolExecutor(max_workers=1)
+                warm_up.submit(self.transcriber.warm_up)
+                warm_up.shutdown(wait=False)
+
                 # 2. Subtitle Extraction & Grouping
                 setup_progress.update(task_id, description="Extracting subtitles...")
-                temp_ass = os.path.join(self.temp_dir, "extracted.ass")
                 try:
-                    self.media.extract_subtitles(self.video_file, best_sub['index'], temp_ass)
+                    ass_text = self.media.extract_subtitles_text(self.video_file, best_sub['index'], best_sub.get('codec'))
                 except Exception as e:
                     setup_progress.stop()
-                    logger.error(f"Failed to extract subtitles: {e}")
-                    console.print(f"[bold red]Error:[/bold red] Failed to extract subtitles with FFmpeg.")
+                    logger.error("Failed to extract subtitles: %s", e)
+                    console.print("[bold red]Error:[/bold red] Failed to extract subtitles with FFmpeg.")
                     return
+                if self.keep_temp:
+                    with open(os.path.join(self.temp_dir, "extracted.ass"), 'w', encoding='utf-8') as f:
+                        f.write(ass_text)
                 
-                events = get_dialogue_from_ass(temp_ass)
+                events = get_dialogue_from_ass_text(ass_text, assume_english=best_sub.get('lang') in ("eng", "en"))
                 if not events:
                     setup_progress.stop()
                     logger.error("No dialogue events found in extracted subtitles.")
                     console.print("[bold red]Error:[/bold red] No dialogue events found. The subtitle track might be empty or incompatible.")
                     return
 
-                clusters = group_events(events, target_duration=self.chunk_size)
+                clusters = [part for cluster in group_events(events, target_duration=self.chunk_size) for part in split_if_oversize(cluster)]
                 total_chunks = len(clusters)
                 if self.limit:
                     total_chunks = min(total_chunks, self.limit)
@@ -135,37 +172,103 @@ class SubtitleJob:
                     )
                     console.print(Panel(summary_text, title="Job Summary", expand=False, border_style="cyan"))
 
-                logger.info(f"Selected Subtitle Track: {best_sub['index']} (Score: {best_sub['score']:.1f})")
-                logger.info(f"Selected Audio Track: {audio_index}")
-                logger.info(f"Total chunks to process: {total_chunks}")
-            
-            # 4. Main Processing Loop
-            for i, cluster in enumerate(clusters):
-                if self.stop_requested: break
-                if self.limit is not None and i >= self.limit:
-                    logger.info(f"Limit of {self.limit} chunks reached.")
-                    break
-
-                # Use a spinner for the active task if not verbose
-                if not self.verbose:
-                    with console.status(f"Processing Chunk {i+1}/{total_chunks}...") as status:
-                        chunk_subs = self._process_chunk(i, cluster, audio_index, total_chunks, status)
+                logger.info("Selected Subtitle Track: %s (Score: %.1f)", best_sub['index'], best_sub['score'])
+                logger.info("Selected Audio Track: %s", audio_index)
+                logger.info("Total chunks to process: %s", total_chunks)
+
+                if total_chunks < len(clusters):
+                    logger.info("Limit of %s chunks reached.", self.limit)
+                clusters = clusters[:total_chunks]
+
+                # 4. Audio Extraction (a single background ffmpeg pass cuts every uncached
+                # chunk; workers pick their segment up as soon as it is written)
+                bounds = [self._chunk_bounds(c) for c in clusters]
+                missing = [i for i, (start_ms, end_ms) in enumerate(bounds) if not self.cache.has(start_ms, end_ms)]
+                self.audio_slots = {i: slot for slot, i in enumerate(missing)}
+                self.audio_index = audio_index
+                self.audio_codec = best_audio.get('codec')
+                self.audio_channels = best_audio.get('channels')
+                if missing:
+                    logger.info("%s/%s chunks need transcription", len(missing), total_chunks)
                 else:
-                    chunk_subs = self._process_chunk(i, cluster, audio_index, total_chunks)
+                    logger.info("All chunks are cached; skipping audio extraction")
+                setup_progress.update(task_id, description="Extracting audio...")
+                try:
+                    self.audio_chunks = self.media.extract_audio_chunks(self.video_file, audio_index, [bounds[i] for i in missing], self.temp_dir, self.audio_codec, self.audio_channels)
+                except Exception as e:
+                    setup_progress.stop()
+                    logger.error("Failed to extract audio: %s", e)
+                    console.print("[bold red]Error:[/bold red] Failed to extract audio with FFmpeg.")
+                    return
+            
+            # 5. Main Processing Loop
 
-                if chunk_subs:
-                    self.final_subs.extend(chunk_subs)
+            # Chunks are dispatched to a pool of `workers` threads; the AIMD controller decides
+            # how many of them may talk to the API at once.
+            # Results are written to the SRT as soon as every chunk before them is done,
+            # so a stopped or crashed run keeps everything transcribed up to that point.
+            results: list[list[SubtitleEvent] | None] = [None] * total_chunks
+            finished = [False] * total_chunks
+            next_chunk = 0
 
-            # 5. Save Results
-            if self.final_subs:
-                self._save_srt()
+            def complete(index: int, chunk_subs: list[SubtitleEvent] | None) -> None:
+                nonlocal next_chunk
+                results[index] = chunk_subs
+                finished[index] = True
+                progress.advance(progress_task)
+                while next_chunk < total_chunks and finished[next_chunk]:
+                    if results[next_chunk]:
+                        self._write_srt(results[next_chunk])
+                    results[next_chunk] = None
+                    next_chunk += 1
+
+            # A single progress bar advanced from this thread; per-worker spinners would collide
+            progress = Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                console=console,
+                transient=True,
+                disable=self.verbose
+            )
+            with progress, ThreadPoolExecutor(max_workers=self.workers) as executor:
+                progress_task = progress.add_task("Processing chunks...", total=total_chunks)
+                # Misses go to the pool first so the API work starts right away...
+                futures = {
+                    executor.submit(self._process_chunk, i, clusters[i], total_chunks): i
+                    for i in sorted(self.audio_slots)
+                }
+                try:
+                    # ...while cache hits are replayed here, with no threads or subprocesses involved
+                    for i, cluster in enumerate(clusters):
+                        if i not in self.audio_slots:
+                            complete(i, self._process_chunk(i, cluster, total_chunks))
+                    for future in as_completed(futures):
+                        chunk_subs = None if future.cancelled() else future.result()
+                        complete(futures[future], chunk_subs)
+                        if self.stop_requested:
+                            # Chunks that have not started yet would only return None
+                            for pending in futures:
+                                pending.cancel()
+                except BaseException:
+                    # Includes Ctrl+C: queued chunks must not start (and call Gemini) while
+                    # the pool shuts down, and running ones stop at their next check
+                    self.stop_requested = True
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+
+            # 6. Save Results
+            self._close_srt()
+            if self.subs_written:
                 if self.stop_requested:
-                    logger.warning(f"Processing stopped early. Partial results saved to {self.output_path}")
+                    logger.warning("Processing stopped early. Partial results saved to %s", self.output_path)
                 else:
-                    logger.info(f"Success! Saved to {self.output_path}")
+                    logger.info("Success! Saved to %s", self.output_path)
                     if not self.verbose:
                         console.print(f"[green]✓[/green] Subtitles saved to: [bold]{self.output_path}[/bold]")
-            else:
+            elif not self.output_failed:
                 logger.error("No subtitles were generated.")
                 console.print("[bold yellow]Warning:[/bold yellow] No subtitles were generated. Check the audio track and model output.")
 
@@ -177,86 +280,158 @@ class SubtitleJob:
         finally:
             self.cleanup()
 
-    def _process_chunk(self, index: int, cluster: list[SubtitleEvent], audio_index: int | str, total_chunks: int, status_spinner=None) -> list[SubtitleEvent] | None:
-        start_ms = max(0, cluster[0]['start'] - AUDIO_PADDING_MS)
-        end_ms = cluster[-1]['end'] + AUDIO_PADDING_MS
+    @staticmethod
+    def _chunk_bounds(cluster: list[SubtitleEvent]) -> tuple[int, int]:
+        start_ms = max(0, cluster[0].start - AUDIO_PADDING_MS)
+        end_ms = cluster[-1].end + AUDIO_PADDING_MS
+        return start_ms, end_ms
+
+    def _load_audio(self, index: int, start_ms: int, end_ms: int) -> bytes:
+        """
+        Reads a chunk's audio into memory and deletes the file right away; retries reuse
+        the bytes, so nothing else needs it on disk.
+        """
+        slot = self.audio_slots.get(index)
+        if slot is not None:
+            audio_chunk = self.audio_chunks.get(slot)
+        else:
+            # Chunk was cached when extraction was planned but its entry has since been
+            # dropped (failed validation), so cut its audio on demand.
+            audio_chunk = os.path.join(self.temp_dir, f"chunk_{index}_retry.m4a")
+            self.media.extract_audio_chunk(self.video_file, self.audio_index, start_ms, end_ms, audio_chunk, self.audio_codec, self.audio_channels)
+        with open(audio_chunk, 'rb') as f:
+            audio = f.read()
+        if not self.keep_temp:
+            os.remove(audio_chunk)
+        return audio
+
+    def _process_chunk(self, index: int, cluster: list[SubtitleEvent], total_chunks: int) -> list[SubtitleEvent] | None:
+        start_ms, end_ms = self._chunk_bounds(cluster)
         timestamp = ms_to_mm_ss_mmm(start_ms).split(',')[0] # Get mm:ss
         chunk_label = f"Chunk {index+1:02d}/{total_chunks:02d}"
-        
-        cache_path = get_cache_path(self.video_file, start_ms, end_ms)
+        eng_ctx = None
+        audio = None
         
         for attempt in range(MAX_RETRIES):
+            if self.stop_requested: return None
             raw_text = None
+            relative_subs = None
             from_cache = False
             
-            if os.path.exists(cache_path):
-                logger.debug(f"[{index+1}/{total_chunks}] Using cache")
+            cached = self.cache.get(start_ms, end_ms)
+            if cached is not None:
+                logger.debug("[%s/%s] Using cache", index+1, total_chunks)
                 if not self.verbose:
                     console.print(f"[{timestamp}] {chunk_label}: [dim]Using Cache[/dim]")
                 
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    raw_text = f.read()
+                raw_text, relative_subs = cached
                 from_cache = True
             else:
                 action = "Transcribing" if attempt == 0 else "Retrying"
-                logger.debug(f"[{index+1}/{total_chunks}] {action} (Attempt {attempt + 1})")
-                
-                if status_spinner:
-                    status_spinner.update(f"{action} {chunk_label} ({timestamp})...")
+                logger.debug("[%s/%s] %s (Attempt %s)", index+1, total_chunks, action, attempt + 1)
 
-                audio_chunk = os.path.join(self.temp_dir, f"chunk_{index}.m4a")
-                
+
+                # Wait for this chunk's audio before taking an API permit, so a slow
+                # ffmpeg pass never holds a concurrency slot.
                 try:
-                    self.media.extract_audio_chunk(self.video_file, audio_index, start_ms, end_ms, audio_chunk)
-                    eng_ctx = "\n".join([f"[{ms_to_mm_ss_mmm(e['start'] - start_ms)} - {ms_to_mm_ss_mmm(e['end'] - start_ms)}] {e['text']}" for e in cluster])
+                    if audio is None:
+                        audio = self._load_audio(index, start_ms, end_ms)
+                except Exception as e:
+                    logger.error("Audio extraction failed for chunk %s: %s", index, e)
+                    if not self.verbose:
+                        console.print(f"[{timestamp}] {chunk_label}: [bold red]Error: {e}[/bold red]")
+                    self.stop_requested = True
+                    return None
+
+                # Wait for the concurrency governor before touching the API; another
+                # worker may have requested a stop while we were queued.
+                self.concurrency.acquire()
+                if self.stop_requested:
+                    self.concurrency.release()
+                    return None
+                latency = None
+                throttled = False
+                try:
+                    # Built once per chunk, on the first cache miss, and reused by retries
+                    if eng_ctx is None:
+                        eng_ctx = "\n".join(f"[{ms_to_mm_ss_mmm(e.start - start_ms)} - {ms_to_mm_ss_mmm(e.end - start_ms)}] {e.text}" for e in cluster)
                     
-                    raw_text = self.transcriber.transcribe_chunk(audio_chunk, eng_ctx, self.model, self.series_context)
-                    with open(cache_path, 'w', encoding='utf-8') as f:
-                        f.write(raw_text)
+                    # Only the API call itself is timed; local rate-limiter queuing and
+                    # backoff sleeps would otherwise read as server-side latency
+                    latencies: list[float] = []
+                    raw_text = self.transcriber.transcribe_chunk(
+                        audio, eng_ctx, self.model, self.series_context,
+                        on_throttle=self.concurrency.record_throttle, on_latency=latencies.append
+                    )
+                    latency = latencies[-1] if latencies else None
+                    relative_subs = parse_timestamps(raw_text, 0)
+                    self.cache.put(start_ms, end_ms, raw_text, relative_subs)
                 except RateLimitError:
-                    logger.warning(f"Rate limit hit at chunk {index}. Stopping.")
+                    throttled = True
+                    logger.warning("Rate limit hit at chunk %s. Stopping.", index)
                     if not self.verbose:
                          console.print(f"[{timestamp}] {chunk_label}: [bold red]Rate Limit Hit[/bold red]")
                     self.stop_requested = True
                     return None
                 except Exception as e:
-                    logger.error(f"Error in chunk {index}: {e}")
+                    logger.error("Error in chunk %s: %s", index, e)
                     if not self.verbose:
                         console.print(f"[{timestamp}] {chunk_label}: [bold red]Error: {e}[/bold red]")
                     self.stop_requested = True
                     return None
                 finally:
-                    if os.path.exists(audio_chunk): os.remove(audio_chunk)
+                    self.concurrency.release(latency, throttled)
 
             if raw_text:
-                subs = parse_timestamps(raw_text, start_ms)
+                # Parsed timestamps are cached relative to the chunk, so a warm run only shifts them
+                if relative_subs is None:
+                    relative_subs = parse_timestamps(raw_text, 0)
+                    self.cache.put(start_ms, end_ms, raw_text, relative_subs)
+                subs = [SubtitleEvent(s.start + start_ms, s.end + start_ms, s.text) for s in relative_subs]
                 if validate_chunk(subs):
                     if not self.verbose and not from_cache:
                          console.print(f"[{timestamp}] {chunk_label}: [green]Transcribed[/green]")
                     return subs
                 else:
-                    logger.warning(f"Validation failed for chunk {index}. Retrying...")
+                    logger.warning("Validation failed for chunk %s. Retrying...", index)
                     if not self.verbose:
                         console.print(f"[{timestamp}] {chunk_label}: [yellow]Validation Failed (Retrying)[/yellow]")
-                    if os.path.exists(cache_path): os.remove(cache_path)
+                    self.cache.delete(start_ms, end_ms)
         
-        logger.error(f"Chunk {index} failed after {MAX_RETRIES} attempts.")
+        logger.error("Chunk %s failed after %s attempts.", index, MAX_RETRIES)
         if not self.verbose:
             console.print(f"[{timestamp}] {chunk_label}: [bold red]Failed[/bold red]")
         return None
 
-    def _save_srt(self):
+    def _write_srt(self, subs: list[SubtitleEvent]) -> None:
+        if self.output_failed:
+            return
         try:
-            with open(self.output_path, "w", encoding="utf-8") as f:
-                for k, sub in enumerate(self.final_subs):
-                    f.write(f"{k+1}\n{ms_to_srt_time(sub['start'])} --> {ms_to_srt_time(sub['end'])}\n{sub['text']}\n\n")
+            if self.srt_file is None:
+                self.srt_file = open(self.output_path, "w", encoding="utf-8")
+            # One write per chunk; the running counter keeps numbering continuous across chunks
+            self.srt_file.writelines([
+                f"{self.subs_written + k + 1}\n{ms_to_srt_time(sub.start)} --> {ms_to_srt_time(sub.end)}\n{sub.text}\n\n"
+                for k, sub in enumerate(subs)
+            ])
+            self.srt_file.flush()
+            self.subs_written += len(subs)
         except PermissionError:
-            logger.error(f"Permission denied when writing to {self.output_path}")
+            self.output_failed = True
+            self.stop_requested = True
+            logger.error("Permission denied when writing to %s", self.output_path)
             console.print(f"[bold red]Error:[/bold red] Permission denied when writing to [bold]{self.output_path}[/bold]")
         except Exception as e:
-            logger.error(f"Failed to save subtitles: {e}")
+            self.output_failed = True
+            self.stop_requested = True
+            logger.error("Failed to save subtitles: %s", e)
             console.print(f"[bold red]Error:[/bold red] Failed to save subtitles to {self.output_path}: {e}")
 
+    def _close_srt(self) -> None:
+        if self.srt_file is not None:
+            self.srt_file.close()
+            self.srt_file = None
+
 def process_video(video_file: str, **kwargs) -> None:
     verbose = kwargs.get('verbose', False)
     # Enable console logging if verbose is True, otherwise disable it to use Rich
@@ -1,11 +1,28 @@
 import os
 import sys
 import time
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 logger = logging.getLogger("subtitle_generator")
 
+# Background thread that does the actual file/console writes, and the handlers it owns
+_listener: QueueListener | None = None
+_handlers: list[logging.Handler] = []
+
+def _stop_listener():
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+    # Flushes and releases the previous run's log file and stream
+    for handler in _handlers:
+        handler.close()
+    _handlers.clear()
+
 def setup_logging(verbose=False, console_output=True):
     PROJECT_ROOT = Path(__file__).resolve().parent.parent
     LOG_DIR = PROJECT_ROOT / "logs"
@@ -34,15 +51,25 @@ def setup_logging(verbose=False, console_output=True):
         stream_handler.setLevel(logging.DEBUG if verbose else logging.INFO)
         handlers.append(stream_handler)
 
-    logging.basicConfig(
-        level=root_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=handlers
-    )
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Worker threads only enqueue records; a listener thread formats and writes them,
+    # so logging never blocks the hot path on disk or terminal I/O.
+    global _listener
+    _stop_listener()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(root_level)
+    _handlers.extend(handlers)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
     
     # Silence noise from dependencies
     for logger_name in ["google.genai", "google_genai", "httpx", "google.api_core", "google.auth", "urllib3"]:
         logging.getLogger(logger_name).setLevel(logging.WARNING)
     
-    logger.info(f"Logging initialized. File: {LOG_FILE}")
+    logger.info("Logging initialized. File: %s", LOG_FILE)
+
+atexit.register(_stop_listener)
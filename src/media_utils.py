@@ -1,14 +1,37 @@
+import os
 import json
 import re
 import logging
-from typing import Any, TypedDict
+import time
+import sqlite3
+import threading
+import subprocess
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Iterable, Iterator, TypedDict
 from datetime import timedelta
-import pysubs2
-from src.config import CHUNK_TARGET_SECONDS, MAX_GAP_SECONDS
+from src.config import CHUNK_TARGET_SECONDS, MAX_GAP_SECONDS, AUDIO_PADDING_MS, CONTEXT_TOKEN_BUDGET, SHORT_TEXT_CHARS, AUDIO_CHANNELS, AUDIO_SAMPLE_RATE, AUDIO_BITRATE
 from src.utils import SubtitleEvent, run_command
+from src.cache import ProbeCache
 
 logger = logging.getLogger(__name__)
 
+# Drawing mode (\p1..\p9) is an override tag, so it is only looked for inside a {...} block
+_ASS_DRAWING = re.compile(r'\{[^}]*\\p[1-9]')
+# A negated class instead of a lazy .*? keeps the tag match linear
+_ASS_BRACES = re.compile(r'\{[^}]*\}')
+# Line breaks (\N, \n) and whitespace runs collapse to a single space in one pass
+_BREAKS_AND_WHITESPACE = re.compile(r'(?:\\[Nn]|\s)+')
+_NON_LETTERS = re.compile(r'[0-9\W_]+')
+# Matches start-of-token to avoid false positives (e.g. 'Top' containing 'op')
+_STYLE_BLACKLIST = re.compile(r'(?:^|[\W_])(op|ed|song|sign|title|credit|note)')
+# '\fad' also covers '\fade'
+_TYPESETTING_TAGS = re.compile(r'\\(?:pos|move|fad)')
+
+# h:mm:ss.cc, with the fraction read as hundredths (or tenths/milliseconds when shorter/longer)
+_ASS_TIMESTAMP = re.compile(r'(\d+):(\d{1,2}):(\d{1,2})[.,](\d{1,3})')
+
 class TrackInfo(TypedDict):
     index: int | str
     score: float
@@ -20,104 +43,219 @@ def clean_ass_text(text: str) -> str:
     """
     Cleans ASS text by removing drawing commands, override tags, and normalizing whitespace.
     """
-    if re.search(r'\\p[1-9]', text):
+    if _ASS_DRAWING.search(text):
         return ""
-    text = re.sub(r'\{.*?\}', '', text)
-    text = text.replace(r'\N', ' ').replace(r'\n', ' ')
-    text = re.sub(r'\s+', ' ', text)
+    text = _ASS_BRACES.sub('', text)
+    text = _BREAKS_AND_WHITESPACE.sub(' ', text)
     return text.strip()
 
 def is_mostly_english(text: str) -> bool:
     if not text: return False
-    text = re.sub(r'[0-9\W_]+', '', text)
+    # Interjections like "Ah!" or "Un." are too short for a meaningful ratio; keep them
+    # without running the strip/count as long as they are plain ASCII.
+    if len(text) < SHORT_TEXT_CHARS and text.isascii(): return True
+    text = _NON_LETTERS.sub('', text)
     if not text: return False
-    ascii_count = sum(1 for c in text if ord(c) < 128)
+    # Dropping non-ASCII characters in the codec counts the ASCII ones without a Python-level loop
+    ascii_count = len(text.encode('ascii', 'ignore'))
     return (ascii_count / len(text)) > 0.8
 
-def get_dialogue_from_ass(ass_path: str) -> list[SubtitleEvent]:
-    dialogue_events: list[SubtitleEvent] = []
-    logger.debug(f"Parsing ASS file with pysubs2: {ass_path}")
-    
-    stats = {
-        'total': 0,
-        'style': 0,
-        'pos': 0,
-        'drawing': 0,
-        'empty': 0,
-        'non_english': 0,
-        'kept': 0
-    }
+def _ass_time_to_ms(value: str) -> int:
+    match = _ASS_TIMESTAMP.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid ASS timestamp: {value!r}")
+    h, m, s, frac = match.groups()
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(frac.ljust(3, '0'))
+
+def iter_ass_dialogue(lines: Iterable[str]) -> Iterator[tuple[int, int, str, str, str]]:
+    """
+    Streams (start_ms, end_ms, style, name, text) for every Dialogue line of an ASS/SSA
+    script. Everything outside [Events] (styles, embedded fonts and graphics) is skipped
+    without being parsed, and field positions come from the section's Format line.
+    """
+    in_events = False
+    n_fields = 0
+    # Positions of the fields we read, resolved once per Format line instead of per event
+    i_start = i_end = i_style = i_name = i_text = -1
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_events = line.lower() == '[events]'
+            continue
+        if not in_events:
+            continue
+        if line.startswith('Format:'):
+            fields = [f.strip().lower() for f in line[len('Format:'):].split(',')]
+            n_fields = len(fields)
+            i_start, i_end, i_style, i_name, i_text = (
+                fields.index(f) if f in fields else -1 for f in ('start', 'end', 'style', 'name', 'text')
+            )
+            continue
+        if not n_fields or i_start < 0 or i_end < 0 or not line.startswith('Dialogue:'):
+            continue
+
+        # Text is always the last field and may itself contain commas
+        values = line[len('Dialogue:'):].split(',', n_fields - 1)
+        if len(values) != n_fields:
+            continue
+        try:
+            start = _ass_time_to_ms(values[i_start])
+            end = _ass_time_to_ms(values[i_end])
+        except ValueError:
+            continue
+        yield (
+            start,
+            end,
+            values[i_style].strip() if i_style >= 0 else '',
+            values[i_name].strip() if i_name >= 0 else '',
+            values[i_text] if i_text >= 0 else '',
+        )
 
+def get_dialogue_from_ass(ass_path: str, assume_english: bool = False) -> list[SubtitleEvent]:
+    logger.debug("Parsing ASS file: %s", ass_path)
     try:
-        subs = pysubs2.load(ass_path, encoding="utf-8")
+        with open(ass_path, 'r', encoding='utf-8-sig') as f:
+            events = list(iter_ass_dialogue(f))
     except Exception as e:
-        logger.error(f"Failed to load ASS file {ass_path}: {e}")
+        logger.error("Failed to load ASS file %s: %s", ass_path, e)
         return []
+    return _filter_dialogue(events, assume_english)
 
-    for i, event in enumerate(subs):
-        stats['total'] += 1
-        style = event.style.lower()
-        name = event.name.lower()
-        text_raw = event.text
+def get_dialogue_from_ass_text(ass_text: str, assume_english: bool = False) -> list[SubtitleEvent]:
+    """
+    Same as get_dialogue_from_ass, for a script already in memory (e.g. piped from ffmpeg).
+    """
+    return _filter_dialogue(iter_ass_dialogue(ass_text.lstrip('\ufeff').splitlines()), assume_english)
+
+def _filter_dialogue(events: Iterable[tuple[int, int, str, str, str]], assume_english: bool = False) -> list[SubtitleEvent]:
+    """
+    Keeps the spoken dialogue lines. With assume_english (the track is tagged English)
+    the per-line English-ratio check is skipped, since the language is already known.
+    """
+    dialogue_events: list[SubtitleEvent] = []
+    n_total = n_style = n_pos = n_drawing = n_empty = n_non_english = 0
+
+    # Hot loop over every event: bind lookups to locals and only format per-line debug
+    # messages when debug logging is actually on
+    debug = logger.isEnabledFor(logging.DEBUG)
+    style_blocked = _STYLE_BLACKLIST.search
+    has_typesetting = _TYPESETTING_TAGS.search
+    has_drawing = _ASS_DRAWING.search
+    clean = clean_ass_text
+    english = is_mostly_english
+    append = dialogue_events.append
+
+    # A file only uses a handful of style/name pairs, so the blacklist verdict is memoized per pair
+    style_verdicts: dict[tuple[str, str], bool] = {}
+
+    for i, (start, end, style, name, text_raw) in enumerate(events):
+        n_total += 1
         
         # 1. Style/Name Blacklist
-        # Regex matches start-of-token to avoid false positives (e.g. 'Top' containing 'op')
-        if re.search(r'(?:^|[\W_])(op|ed|song|sign|title|credit|note)', style) or \
-           re.search(r'(?:^|[\W_])(op|ed|song|sign|title|credit|note)', name):
-            logger.debug(f"Line {i+1}: Skipped due to style/name '{style}/{name}' - '{text_raw}'")
-            stats['style'] += 1
+        style_key = (style, name)
+        blocked = style_verdicts.get(style_key)
+        if blocked is None:
+            blocked = bool(style_blocked(style.lower()) or style_blocked(name.lower()))
+            style_verdicts[style_key] = blocked
+        if blocked:
+            if debug:
+                logger.debug("Line %s: Skipped due to style/name '%s/%s' - '%s'", i+1, style.lower(), name.lower(), text_raw)
+            n_style += 1
             continue
             
         # 2. Typesetting Tags (pos, move, fad, fade)
-        if any(x in text_raw for x in [r'\pos', r'\move', r'\fad', r'\fade']):
-            logger.debug(f"Line {i+1}: Skipped due to typesetting tags - '{text_raw}'")
-            stats['pos'] += 1
+        if has_typesetting(text_raw):
+            if debug:
+                logger.debug("Line %s: Skipped due to typesetting tags - '%s'", i+1, text_raw)
+            n_pos += 1
             continue
 
-        clean_text = clean_ass_text(text_raw)
+        clean_text = clean(text_raw)
         
-        # 3. Drawing commands
-        if not clean_text and re.search(r'\\p[1-9]', text_raw):
-             logger.debug(f"Line {i+1}: Skipped due to drawing commands - '{text_raw}'")
-             stats['drawing'] += 1
-             continue
-
         if not clean_text:
-             logger.debug(f"Line {i+1}: Skipped (empty after cleaning) - '{text_raw}'")
-             stats['empty'] += 1
-             continue
+            # 3. Drawing commands
+            if has_drawing(text_raw):
+                if debug:
+                    logger.debug("Line %s: Skipped due to drawing commands - '%s'", i+1, text_raw)
+                n_drawing += 1
+            else:
+                if debug:
+                    logger.debug("Line %s: Skipped (empty after cleaning) - '%s'", i+1, text_raw)
+                n_empty += 1
+            continue
              
-        if not is_mostly_english(clean_text):
-            logger.debug(f"Line {i+1}: Skipped (non-English) - '{clean_text}'")
-            stats['non_english'] += 1
+        if not assume_english and not english(clean_text):
+            if debug:
+                logger.debug("Line %s: Skipped (non-English) - '%s'", i+1, clean_text)
+            n_non_english += 1
             continue
 
-        dialogue_events.append({
-            'start': event.start,
-            'end': event.end,
-            'text': clean_text
-        })
-        stats['kept'] += 1
+        append(SubtitleEvent(start, end, clean_text))
 
-    logger.debug(f"ASS Parse Stats: {stats}")
+    if debug:
+        stats = {
+            'total': n_total,
+            'style': n_style,
+            'pos': n_pos,
+            'drawing': n_drawing,
+            'empty': n_empty,
+            'non_english': n_non_english,
+            'kept': len(dialogue_events)
+        }
+        logger.debug("ASS Parse Stats: %s", stats)
     return dialogue_events
 
+@lru_cache(maxsize=1)
+def _shared_probe_cache() -> ProbeCache:
+    # One connection per process; ProbeCache serializes access to it with its own lock
+    return ProbeCache()
+
+@lru_cache(maxsize=32)
+def _probe_streams(ffprobe_path: str, video_file: str, mtime_ns: int, size: int) -> list[dict[str, Any]]:
+    key = f"{video_file}|{mtime_ns}|{size}"
+    try:
+        probe_cache = _shared_probe_cache()
+        streams = probe_cache.get(key)
+        if streams is not None:
+            logger.debug("Using cached ffprobe result for %s", video_file)
+            return streams
+    except sqlite3.Error as e:
+        logger.warning("Probe cache unavailable: %s", e)
+        probe_cache = None
+
+    cmd = [ffprobe_path, "-v", "error", "-show_entries", "stream=index,codec_type,codec_name,channels:stream_tags=title,language,NUMBER_OF_FRAMES", "-of", "json=compact=1", video_file]
+    # json.loads takes the raw bytes, so stdout is never decoded to str first
+    result = run_command(cmd)
+    streams = json.loads(result.stdout).get("streams", [])
+    if probe_cache:
+        try:
+            probe_cache.put(key, streams)
+        except sqlite3.Error as e:
+            logger.warning("Failed to persist ffprobe result: %s", e)
+    return streams
+
 class MediaProcessor:
     def __init__(self, ffmpeg_path: str = "ffmpeg", ffprobe_path: str = "ffprobe"):
         self.ffmpeg_path = ffmpeg_path
         self.ffprobe_path = ffprobe_path
 
+    def probe_streams(self, video_file: str) -> list[dict[str, Any]]:
+        """
+        Returns the stream listing shared by both track selectors. A single ffprobe call is
+        memoized in-process and persisted across runs, keyed by (path, mtime, size).
+        """
+        st = os.stat(video_file)
+        return _probe_streams(self.ffprobe_path, os.path.abspath(video_file), st.st_mtime_ns, st.st_size)
+
     def get_best_subtitle_track(self, video_file: str) -> dict[str, Any] | None:
-        cmd = [self.ffprobe_path, "-v", "error", "-show_entries", "stream=index,codec_type:stream_tags=title,language,NUMBER_OF_FRAMES", "-of", "json", video_file]
         try:
-            result = run_command(cmd)
-            data = json.loads(result.stdout)
+            streams = self.probe_streams(video_file)
         except Exception as e:
-            logger.error(f"FFprobe failed for subtitles: {e}")
+            logger.error("FFprobe failed for subtitles: %s", e)
             return None
             
         candidates = []
-        for stream in data.get("streams", []):
+        for stream in streams:
             if stream.get("codec_type") == "subtitle":
                 tags = stream.get("tags", {})
                 lang = tags.get("language", "").lower()
@@ -139,6 +277,7 @@ class MediaProcessor:
                 candidates.append({
                     'index': stream["index"],
                     'score': score,
+                    'codec': stream.get("codec_name", ""),
                     'frames': frames,
                     'lang': lang,
                     'title': title
@@ -148,16 +287,14 @@ class MediaProcessor:
         return sorted(candidates, key=lambda x: x['score'], reverse=True)[0]
 
     def get_best_audio_track(self, video_file: str) -> dict[str, Any] | None:
-        cmd = [self.ffprobe_path, "-v", "error", "-show_entries", "stream=index,codec_type:stream_tags=title,language", "-of", "json", video_file]
         try:
-            result = run_command(cmd)
-            data = json.loads(result.stdout)
+            streams = self.probe_streams(video_file)
         except Exception as e:
-            logger.error(f"FFprobe failed for audio: {e}")
+            logger.error("FFprobe failed for audio: %s", e)
             return None
             
         candidates = []
-        for stream in data.get("streams", []):
+        for stream in streams:
             if stream.get("codec_type") == "audio":
                 tags = stream.get("tags", {})
                 lang = tags.get("language", "").lower()
@@ -171,17 +308,36 @@ class MediaProcessor:
                     'index': stream["index"],
                     'score': score,
                     'lang': lang,
-                    'title': title
+                    'title': title,
+                    'codec': stream.get("codec_name", ""),
+                    'channels': stream.get("channels")
                 })
                 
         if not candidates: return None
         return sorted(candidates, key=lambda x: (x['score'], -x['index']), reverse=True)[0]
 
-    def extract_subtitles(self, video_file: str, track_index: int, output_ass: str) -> None:
-        cmd = [self.ffmpeg_path, "-y", "-i", video_file, "-map", f"0:{track_index}", output_ass]
-        run_command(cmd)
+    def extract_subtitles_text(self, video_file: str, track_index: int, codec: str | None = None) -> str:
+        """
+        Extracts a subtitle track as ASS through a pipe, without a temp file.
+        """
+        cmd = [self.ffmpeg_path, "-loglevel", "error", "-i", video_file, "-map", f"0:{track_index}", *self._subtitle_codec_args(codec), "-f", "ass", "pipe:1"]
+        return run_command(cmd, encoding="utf-8", errors="replace").stdout
+
+    @staticmethod
+    def _subtitle_codec_args(codec: str | None) -> list[str]:
+        # ASS/SSA tracks are copied verbatim; anything else (SRT, mov_text...) has to be converted
+        return ["-c:s", "copy"] if codec in ("ass", "ssa") else ["-c:s", "ass"]
+
+    @staticmethod
+    def _audio_codec_args(codec: str | None, channels: int | None = None) -> list[str]:
+        # Transcription only needs the voice, so chunks are downmixed to low-bitrate mono
+        # AAC, a fraction of the bytes sent with every request. Sources that are already
+        # mono AAC are copied as-is instead of re-encoded.
+        if codec == "aac" and channels == 1:
+            return ["-c:a", "copy"]
+        return ["-ac", str(AUDIO_CHANNELS), "-ar", str(AUDIO_SAMPLE_RATE), "-c:a", "aac", "-b:a", AUDIO_BITRATE]
 
-    def extract_audio_chunk(self, video_file: str, audio_index: int | str, start_ms: int, end_ms: int, output_file: str) -> None:
+    def extract_audio_chunk(self, video_file: str, audio_index: int | str, start_ms: int, end_ms: int, output_file: str, codec: str | None = None, channels: int | None = None) -> None:
         duration_s = (end_ms - start_ms) / 1000.0
         cmd = [
             self.ffmpeg_path, "-y", 
@@ -189,33 +345,166 @@ class MediaProcessor:
             "-i", video_file,
             "-map", f"0:{audio_index}", 
             "-t", str(duration_s), 
-            "-vn", "-c:a", "aac", "-b:a", "128k", 
+            "-vn", *self._audio_codec_args(codec, channels), 
             output_file
         ]
         run_command(cmd)
 
+    def extract_audio_chunks(self, video_file: str, audio_index: int | str, ranges: list[tuple[int, int]], output_dir: str, codec: str | None = None, channels: int | None = None) -> "AudioChunks":
+        """
+        Cuts every (start_ms, end_ms) range out of the audio track in a single ffmpeg pass
+        using the segment muxer, instead of re-opening and re-seeking the container per chunk.
+        The pass runs in the background; the returned handle yields one file per range, in
+        the same order, as soon as ffmpeg has finished writing it.
+        """
+        if not ranges:
+            return AudioChunks([])
+
+        # The segment muxer can only produce back-to-back pieces, so overlapping ranges
+        # (e.g. after splitting a cluster at a short gap) fall back to one seek per chunk.
+        ordered = sorted(ranges)
+        if any(curr[0] < prev[1] for prev, curr in zip(ordered, ordered[1:])):
+            logger.debug("Audio ranges overlap; extracting chunks individually")
+            paths = []
+            for i, (start_ms, end_ms) in enumerate(ranges):
+                path = os.path.join(output_dir, f"chunk_{i}.m4a")
+                self.extract_audio_chunk(video_file, audio_index, start_ms, end_ms, path, codec, channels)
+                paths.append(path)
+            return AudioChunks(paths)
+
+        # Seek straight to the first chunk and stop after the last one, so the head and tail
+        # of the video (intros, credits, everything past --limit) are never demuxed or
+        # decoded. Cut points are then relative to that window.
+        origin = ordered[0][0]
+        stop = max(end_ms for _, end_ms in ranges)
+        cuts = sorted({ms - origin for r in ranges for ms in r if origin < ms < stop})
+        segment_list = os.path.join(output_dir, "segments.txt")
+        cmd = [
+            self.ffmpeg_path, "-y", "-nostats", "-loglevel", "error",
+            "-ss", f"{origin / 1000:.3f}",
+            "-i", video_file,
+            "-map", f"0:{audio_index}",
+            "-t", f"{(stop - origin) / 1000:.3f}",
+            "-vn", *self._audio_codec_args(codec, channels),
+            "-f", "segment",
+            *(["-segment_times", ",".join(f"{ms / 1000:.3f}" for ms in cuts)] if cuts else []),
+            "-segment_list", segment_list,
+            "-segment_list_type", "flat",
+            "-reset_timestamps", "1",
+            os.path.join(output_dir, "segment_%03d.m4a")
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Executing in background: %s", ' '.join(cmd))
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+        # Segment k spans [cuts[k-1], cuts[k]), so a range starting at a cut point lives in
+        # the segment right after it; the segments between ranges are silence we never read.
+        paths = [os.path.join(output_dir, f"segment_{bisect_right(cuts, start_ms - origin):03d}.m4a") for start_ms, _ in ranges]
+        return AudioChunks(paths, process, segment_list)
+
     def is_valid_media(self, video_file: str) -> bool:
-        cmd = [self.ffprobe_path, "-v", "error", video_file]
+        # Goes through the memoized probe, so the track selectors that follow reuse it
         try:
-            run_command(cmd)
+            self.probe_streams(video_file)
             return True
         except Exception:
             return False
 
+class AudioChunks:
+    """
+    Handle on the audio files cut by extract_audio_chunks. When the cut runs as a
+    background ffmpeg process, get() blocks until the requested segment has been listed
+    in ffmpeg's segment list, which only happens once the segment is fully written.
+    """
+    def __init__(self, paths: list[str], process: subprocess.Popen | None = None, segment_list: str | None = None):
+        self.paths = paths
+        self._process = process
+        self._segment_list = segment_list
+        self._done: set[str] = set()
+        self._wanted = {os.path.basename(p) for p in paths}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _refresh(self) -> None:
+        try:
+            with open(self._segment_list, 'r', encoding='utf-8') as f:
+                listed = {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return
+        # Segments covering the gaps between chunks are never read, so drop them right away
+        output_dir = os.path.dirname(self._segment_list)
+        for name in listed - self._done - self._wanted:
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                pass
+        self._done |= listed
+
+    def get(self, index: int, poll_interval: float = 0.1) -> str:
+        path = self.paths[index]
+        if self._process is None:
+            return path
+
+        name = os.path.basename(path)
+        while True:
+            with self._lock:
+                finished = self._process.poll() is not None
+                self._refresh()
+                if name in self._done:
+                    return path
+                if finished:
+                    stderr = self._process.stderr.read() if self._process.stderr else ""
+                    raise RuntimeError(f"Audio extraction exited with code {self._process.returncode} before writing {name}: {stderr.strip()}")
+            time.sleep(poll_interval)
+
+    def close(self) -> None:
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
 def group_events(events: list[SubtitleEvent], target_duration: float = CHUNK_TARGET_SECONDS) -> list[list[SubtitleEvent]]:
     clusters = []
     if not events: return clusters
+    # Compare in milliseconds and carry the cluster start / previous end in locals,
+    # so each event costs two subtractions instead of two divisions and re-indexing.
+    target_ms = target_duration * 1000
+    max_gap_ms = MAX_GAP_SECONDS * 1000
     current_cluster = [events[0]]
-    for i in range(1, len(events)):
-        prev = events[i-1]
-        curr = events[i]
-        gap = (curr['start'] - prev['end']) / 1000.0
-        duration = (curr['end'] - current_cluster[0]['start']) / 1000.0
-        if duration > target_duration and gap > MAX_GAP_SECONDS:
+    cluster_start = events[0].start
+    prev_end = events[0].end
+    for curr in islice(events, 1, None):
+        start, end = curr.start, curr.end
+        if end - cluster_start > target_ms and start - prev_end > max_gap_ms:
             clusters.append(current_cluster)
             current_cluster = [curr]
+            cluster_start = start
         else:
             current_cluster.append(curr)
+        prev_end = end
     if current_cluster: clusters.append(current_cluster)
-    logger.debug(f"Grouped {len(events)} events into {len(clusters)} chunks")
-    return clusters
\ No newline at end of file
+    logger.debug("Grouped %s events into %s chunks", len(events), len(clusters))
+    return clusters
+
+def estimate_context_tokens(cluster: list[SubtitleEvent]) -> int:
+    # ~3 characters per token for English, plus the timestamp prefix on every line
+    return sum(len(e.text) for e in cluster) // 3 + 30 * len(cluster)
+
+def split_if_oversize(cluster: list[SubtitleEvent], max_tokens: int = CONTEXT_TOKEN_BUDGET, min_gap_ms: int = 2 * AUDIO_PADDING_MS) -> list[list[SubtitleEvent]]:
+    """
+    Splits a cluster at its largest internal gap, recursively, until each part's English
+    context fits the token budget. group_events only bounds duration, so a dense scene
+    could otherwise produce a request whose output gets truncated.
+
+    Only gaps of at least `min_gap_ms` are split on: each chunk's audio is padded on both
+    sides, so a narrower gap would send the same speech in both halves.
+    """
+    if len(cluster) < 2 or estimate_context_tokens(cluster) <= max_tokens:
+        return [cluster]
+    split_at = max(range(1, len(cluster)), key=lambda i: cluster[i].start - cluster[i - 1].end)
+    if cluster[split_at].start - cluster[split_at - 1].end < min_gap_ms:
+        logger.debug("Oversize cluster of %s events has no gap of %sms to split at", len(cluster), min_gap_ms)
+        return [cluster]
+    logger.debug("Splitting oversize cluster of %s events at event %s", len(cluster), split_at)
+    return split_if_oversize(cluster[:split_at], max_tokens, min_gap_ms) + split_if_oversize(cluster[split_at:], max_tokens, min_gap_ms)
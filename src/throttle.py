@@ -0,0 +1,115 @@
+import time
+import logging
+import statistics
+import threading
+from collections import deque
+from src.config import MIN_CONCURRENCY, MAX_CONCURRENCY, AIMD_INCREASE, AIMD_DECREASE, AIMD_LATENCY_WINDOW, AIMD_WARMUP_SAMPLES, AIMD_LATENCY_TOLERANCE, RPM_LIMIT, TPM_LIMIT
+
+logger = logging.getLogger(__name__)
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease concurrency governor.
+
+    Workers call acquire() before issuing a request and release() once it finishes.
+    The number of admitted workers grows by `increase` on every healthy completion and
+    shrinks by `decrease` when the API throttles us or latency inflates past the
+    target established during warm-up.
+    """
+    def __init__(self, min_limit: int = MIN_CONCURRENCY, max_limit: int = MAX_CONCURRENCY,
+                 increase: float = AIMD_INCREASE, decrease: float = AIMD_DECREASE,
+                 window: int = AIMD_LATENCY_WINDOW, warmup: int = AIMD_WARMUP_SAMPLES,
+                 tolerance: float = AIMD_LATENCY_TOLERANCE) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.warmup = warmup
+        self.tolerance = tolerance
+        self.limit = float(min_limit)
+        self.target_latency: float | None = None
+
+        self._active = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= int(self.limit):
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, latency: float | None = None, throttled: bool = False) -> None:
+        """
+        Returns a permit. `latency` is the request duration in seconds (None if no request
+        completed), `throttled` flags a 429/5xx style rejection.
+        """
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self._decrease()
+            elif latency is not None:
+                self._latencies.append(latency)
+                if self.target_latency is None:
+                    if len(self._latencies) >= self.warmup:
+                        self.target_latency = statistics.median(self._latencies)
+                        logger.debug("AIMD target latency set to %.2fs", self.target_latency)
+                    self._increase()
+                elif statistics.median(self._latencies) > self.target_latency * self.tolerance:
+                    self._decrease()
+                else:
+                    self._increase()
+            self._cond.notify_all()
+
+    def record_throttle(self) -> None:
+        """
+        Reports a 429/5xx the transcriber retried internally, so the limit backs off while
+        the request holding the permit is still in flight.
+        """
+        with self._cond:
+            self._decrease()
+
+    def _increase(self) -> None:
+        self.limit = min(float(self.max_limit), self.limit + self.increase)
+
+    def _decrease(self) -> None:
+        self.limit = max(float(self.min_limit), self.limit * self.decrease)
+        logger.debug("AIMD concurrency decreased to %.2f", self.limit)
+
+class RateLimiter:
+    """
+    Sliding-window limiter that paces requests below the per-minute request (RPM)
+    and token (TPM) quotas, so we wait locally instead of burning a rejected call.
+    """
+    def __init__(self, rpm: int = RPM_LIMIT, tpm: int = TPM_LIMIT, window: float = 60.0) -> None:
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+
+        self._req_times: deque[float] = deque()
+        self._token_counts: deque[int] = deque()
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def wait_if_throttled(self, expected_tokens: int) -> None:
+        """
+        Blocks until a request of `expected_tokens` fits in the current window, then records it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._req_times and self._req_times[0] + self.window <= now:
+                    self._req_times.popleft()
+                    self._tokens_in_window -= self._token_counts.popleft()
+
+                over_rpm = len(self._req_times) >= self.rpm
+                over_tpm = bool(self._req_times) and self._tokens_in_window + expected_tokens >= self.tpm
+                if not over_rpm and not over_tpm:
+                    self._req_times.append(now)
+                    self._token_counts.append(expected_tokens)
+                    self._tokens_in_window += expected_tokens
+                    return
+                wait = self._req_times[0] + self.window - now
+
+            logger.debug("Rate limiter engaged, waiting %.1fs", wait)
+            time.sleep(max(wait, 0.01))
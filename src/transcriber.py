@@ -1,8 +1,16 @@
+import io
+import re
 import time
+import random
 import logging
-from google import genai
-from google.genai import types, errors
-from src.config import API_KEY, POLLING_INTERVAL_SECONDS
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable
+from src.config import API_KEY, POLLING_INITIAL_SECONDS, POLLING_MAX_SECONDS, POLLING_TIMEOUT_SECONDS, INLINE_AUDIO_MAX_BYTES, AUDIO_TOKEN_ESTIMATE, API_MAX_RETRIES, MAX_OUTPUT_TOKENS, TEMPERATURE, BACKOFF_BASE_SECONDS, BACKOFF_JITTER_SECONDS, BACKOFF_MAX_SECONDS
+from src.throttle import RateLimiter
+from src.client import get_client
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 logger = logging.getLogger(__name__)
 
@@ -10,90 +18,175 @@ class RateLimitError(Exception):
     """Custom exception for Gemini rate limits."""
     pass
 
+# Chunks are AAC in an MP4 (.m4a) container
+AUDIO_MIME_TYPE = "audio/mp4"
+
+# Shared by every Transcriber so concurrent workers draw from the same quota
+rate_limiter = RateLimiter()
+
+# Errors worth retrying: rate limits and transient server-side failures
+TRANSIENT_ERROR_MARKERS = ("429", "500", "502", "503", "RESOURCE_EXHAUSTED", "UNAVAILABLE")
+_RETRY_HINT = re.compile(r"retry in (\d+\.?\d*)s")
+
+def backoff_delay(attempt: int, err_msg: str) -> float:
+    """
+    Exponential backoff with jitter, never shorter than the server's "retry in Xs" hint.
+    """
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** attempt + random.uniform(0, BACKOFF_JITTER_SECONDS), BACKOFF_MAX_SECONDS)
+    hint = _RETRY_HINT.search(err_msg)
+    if hint:
+        delay = max(delay, float(hint.group(1)))
+    return delay
+
+TRANSCRIPTION_INSTRUCTIONS = (
+    "Transcribe the Japanese speech accurately. "
+    "Ignore non-verbal sounds such as grunts, screams, heavy breathing, laughter, or background noise. "
+    "Only transcribe spoken Japanese words. "
+    "You MUST use the following timestamp format for EVERY line: [MM:SS,mmm - MM:SS,mmm] Dialogue. "
+    "Example: [00:01,250 - 00:03,100] こんにちは"
+)
+
+@lru_cache(maxsize=8)
+def build_prompt_prefix(series_info: str | None) -> str:
+    """
+    Everything in the prompt that precedes the per-chunk English context. It only
+    depends on the series info, which is constant for a run.
+    """
+    parts = [f"Series Information:\n{series_info}"] if series_info else []
+    parts.append(TRANSCRIPTION_INSTRUCTIONS)
+    return "\n\n".join(parts) + "\n\n"
+
+@lru_cache(maxsize=1)
+def generation_config() -> "types.GenerateContentConfig":
+    from google.genai import types
+    return types.GenerateContentConfig(
+        system_instruction="You are an expert Japanese media transcriber.",
+        media_resolution="MEDIA_RESOLUTION_HIGH",
+        max_output_tokens=MAX_OUTPUT_TOKENS,
+        temperature=TEMPERATURE,
+        safety_settings=[
+            types.SafetySetting(category=category, threshold="BLOCK_NONE")
+            for category in (
+                "HARM_CATEGORY_HARASSMENT",
+                "HARM_CATEGORY_HATE_SPEECH",
+                "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                "HARM_CATEGORY_DANGEROUS_CONTENT",
+            )
+        ]
+    )
+
 class Transcriber:
     def __init__(self) -> None:
         if not API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-        self.client = genai.Client(api_key=API_KEY)
 
-    def transcribe_chunk(self, audio_path: str, english_context: str, model_name: str, series_info: str | None = None) -> str:
+    @property
+    def client(self):
+        return get_client()
+
+    def warm_up(self) -> None:
+        """
+        Pays the SDK import and client construction up front, so it can overlap other
+        blocking setup work instead of landing on the first chunk.
+        """
+        try:
+            get_client()
+        except Exception as e:
+            logger.debug("Gemini client warm-up failed: %s", e)
+
+    def transcribe_chunk(self, audio: bytes, english_context: str, model_name: str, series_info: str | None = None,
+                         on_throttle: Callable[[], None] | None = None, on_latency: Callable[[float], None] | None = None) -> str:
+        """
+        Transcribes one chunk. `on_throttle` is called for every rate-limit or transient
+        server error that is retried internally; `on_latency` receives the duration of the
+        successful generate call alone, excluding rate-limiter waits and backoff sleeps.
+        """
+        from google.genai import types, errors
+
+        prompt = f"{build_prompt_prefix(series_info)}English Context Reference:\n{english_context}"
+
         file_name = None
         try:
-            sample_file = self.client.files.upload(file=audio_path)
-            file_name = sample_file.name
-            if not file_name:
-                raise ValueError("Failed to upload file: No name returned.")
-
-            while sample_file.state == types.FileState.PROCESSING:
-                time.sleep(POLLING_INTERVAL_SECONDS)
-                sample_file = self.client.files.get(name=file_name)
-            
-            if sample_file.state == types.FileState.FAILED:
-                raise ValueError(f"File processing failed: {sample_file.name}")
-
-            prompt_parts = []
-            if series_info:
-                prompt_parts.append(f"Series Information:\n{series_info}")
-
-            prompt_parts.append(
-                "Transcribe the Japanese speech accurately. "
-                "Ignore non-verbal sounds such as grunts, screams, heavy breathing, laughter, or background noise. "
-                "Only transcribe spoken Japanese words. "
-                "You MUST use the following timestamp format for EVERY line: [MM:SS,mmm - MM:SS,mmm] Dialogue. "
-                "Example: [00:01,250 - 00:03,100] こんにちは"
-            )
-            prompt_parts.append(f"English Context Reference:\n{english_context}")
-            
-            prompt = "\n\n".join(prompt_parts)
-            
-            logger.debug(f"--- Prompt sent to Gemini ---\n{prompt}\n-----------------------------")
+            # Chunks are small enough to ride inline with the request, which skips the
+            # Files API upload/poll/delete round-trips; only oversize audio is uploaded.
+            if len(audio) <= INLINE_AUDIO_MAX_BYTES:
+                audio_part = types.Part.from_bytes(data=audio, mime_type=AUDIO_MIME_TYPE)
+            else:
+                audio_part = self.client.files.upload(file=io.BytesIO(audio), config=types.UploadFileConfig(mime_type=AUDIO_MIME_TYPE))
+                file_name = audio_part.name
+                if not file_name:
+                    raise ValueError("Failed to upload file: No name returned.")
+
+                # Short clips are usually ready almost immediately, so start polling fast and back
+                # off; the jitter keeps concurrent workers from polling in lockstep
+                poll_delay = POLLING_INITIAL_SECONDS
+                deadline = time.monotonic() + POLLING_TIMEOUT_SECONDS
+                while audio_part.state == types.FileState.PROCESSING:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"File still processing after {POLLING_TIMEOUT_SECONDS}s: {file_name}")
+                    time.sleep(poll_delay + random.uniform(0, poll_delay * 0.1))
+                    poll_delay = min(poll_delay * 2, POLLING_MAX_SECONDS)
+                    audio_part = self.client.files.get(name=file_name)
+
+                if audio_part.state == types.FileState.FAILED:
+                    raise ValueError(f"File processing failed: {audio_part.name}")
+
+            logger.debug("--- Prompt sent to Gemini ---\n%s\n-----------------------------", prompt)
             
-            response = self.client.models.generate_content(
-                model=model_name,
-                contents=[sample_file, prompt],
-                config=types.GenerateContentConfig(
-                    system_instruction="You are an expert Japanese media transcriber.",
-                    media_resolution="MEDIA_RESOLUTION_HIGH",
-                    safety_settings=[
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HARASSMENT",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_HATE_SPEECH",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                            threshold="BLOCK_NONE",
-                        ),
-                        types.SafetySetting(
-                            category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                            threshold="BLOCK_NONE",
-                        ),
-                    ]
-                )
-            )
-            logger.debug(f"--- Response from Gemini ---\n{response.text}\n----------------------------")
-            return response.text or ""
+            response = self._generate_with_backoff(model_name, [audio_part, prompt], len(prompt) // 4 + AUDIO_TOKEN_ESTIMATE, on_throttle, on_latency)
+            text = response.text or ""
+            logger.debug("--- Response from Gemini ---\n%s\n----------------------------", text)
+            return text
         
         except errors.ClientError as e:
             # 429 is usually ClientError in this SDK
             if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                logger.warning(f"Gemini API rate limit exceeded: {e}")
+                logger.warning("Gemini API rate limit exceeded: %s", e)
                 raise RateLimitError(str(e))
-            logger.error(f"Gemini Client Error: {e}")
+            logger.error("Gemini Client Error: %s", e)
             raise e
         except errors.APIError as e:
-            logger.error(f"Gemini API Error: {e}")
+            logger.error("Gemini API Error: %s", e)
             raise e
         except Exception as e:
-            logger.error(f"Unexpected error in transcribe_chunk: {e}")
+            logger.error("Unexpected error in transcribe_chunk: %s", e)
             raise e
         finally:
             if file_name:
                 try:
                     self.client.files.delete(name=file_name)
-                    logger.debug(f"Deleted remote file: {file_name}")
+                    logger.debug("Deleted remote file: %s", file_name)
                 except Exception as e:
-                    logger.warning(f"Failed to delete remote file {file_name}: {e}")
+                    logger.warning("Failed to delete remote file %s: %s", file_name, e)
+
+    def _generate_with_backoff(self, model_name: str, contents: list, expected_tokens: int,
+                               on_throttle: Callable[[], None] | None = None,
+                               on_latency: Callable[[float], None] | None = None) -> "types.GenerateContentResponse":
+        """
+        Calls generate_content, retrying transient failures with exponential backoff and jitter.
+        """
+        from google.genai import errors
+
+        attempt = 0
+        while True:
+            rate_limiter.wait_if_throttled(expected_tokens)
+            try:
+                request_start = time.monotonic()
+                response = self.client.models.generate_content(
+                    model=model_name,
+                    contents=contents,
+                    config=generation_config()
+                )
+                if on_latency is not None:
+                    on_latency(time.monotonic() - request_start)
+                return response
+            except errors.APIError as e:
+                err_msg = str(e)
+                attempt += 1
+                if attempt >= API_MAX_RETRIES or not any(code in err_msg for code in TRANSIENT_ERROR_MARKERS):
+                    raise
+                if on_throttle is not None:
+                    on_throttle()
+                wait = backoff_delay(attempt - 1, err_msg)
+                logger.warning("Transient Gemini error (attempt %s/%s), retrying in %.1fs: %s", attempt, API_MAX_RETRIES, wait, e)
+                time.sleep(wait)
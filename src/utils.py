@@ -2,34 +2,75 @@ import os
 import re
 import logging
 import subprocess
-from typing import TypedDict, Any
-from datetime import timedelta
+from functools import lru_cache
+from typing import NamedTuple, Any
 from src.config import CACHE_DIR, CPS_THRESHOLD_MAX, CPS_THRESHOLD_MIN, MAX_SUBTITLE_DURATION_S
 
 logger = logging.getLogger(__name__)
 
-class SubtitleEvent(TypedDict):
+# First "start - end" pair on each line plus the rest of that line, minus the closing
+# bracket, colon and surrounding whitespace; [^\S\n] keeps the whitespace matches from
+# running across line breaks. A timestamp is [[HH:]MM:]SS with an optional fraction,
+# exactly the shapes parse_time_to_ms accepts; the lookarounds stop a malformed
+# timestamp from matching by its head or tail.
+_TS = r"(?<![\d:.,])(?:\d+:){0,2}\d+(?:[.,]\d+)?(?!\d|:\d)"
+_TS_LINE = re.compile(rf"^[^\n]*?({_TS})[^\S\n]*-[^\S\n]*({_TS})(?:[\]:]|[^\S\n])*([^\n]*?)[^\S\n]*$", re.MULTILINE)
+
+_JP_RANGE = r'[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff\u3000-\u303f\uff00-\uffef]'
+_PUNCT = r'[!?.,:;]'
+# Whitespace between two Japanese characters, or between Japanese and punctuation in
+# either order, all removed in a single scan
+_JP_SPACE = re.compile(rf'(?<={_JP_RANGE})\s+(?={_JP_RANGE}|{_PUNCT})|(?<={_PUNCT})\s+(?={_JP_RANGE})')
+
+class SubtitleEvent(NamedTuple):
+    """
+    One subtitle line. A tuple rather than a dict: attribute reads are slot lookups and
+    each event is a fraction of the size, which adds up over thousands of lines.
+    """
     start: float | int
     end: float | int
     text: str
 
-def run_command(cmd: list[str], timeout: float | None = None) -> subprocess.CompletedProcess:
+def run_command(cmd: list[str], timeout: float | None = None, *, text: bool = False, encoding: str | None = None, errors: str | None = None) -> subprocess.CompletedProcess:
     """
-    Centralized subprocess execution with logging.
+    Centralized subprocess execution with logging. Output is captured as bytes, so
+    nothing is decoded unless the caller asks for text (text=True or an encoding);
+    stderr is only decoded when the command fails.
     """
-    logger.debug(f"Executing: {' '.join(cmd)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Executing: %s", ' '.join(cmd))
     try:
-        return subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=timeout)
+        return subprocess.run(cmd, capture_output=True, text=text, check=True, timeout=timeout, encoding=encoding, errors=errors)
     except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed: {' '.join(cmd)}")
-        logger.error(f"Stderr: {e.stderr}")
+        logger.error("Command failed: %s", ' '.join(cmd))
+        stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else e.stderr
+        logger.error("Stderr: %s", stderr)
         raise e
 
+@lru_cache(maxsize=8)
+def load_series_context(path: str | None) -> str | None:
+    """
+    Reads a series context file once per process; jobs sharing a context file reuse it.
+    """
+    if not path:
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except Exception as e:
+        logger.error("Failed to read context file: %s", e)
+        return None
+
 def get_cache_path(video_file: str, start_ms: float | int, end_ms: float | int) -> str:
-    base = os.path.basename(video_file)
-    os.makedirs(os.path.join(CACHE_DIR, base), exist_ok=True)
-    return os.path.join(CACHE_DIR, base, f"{start_ms}_{end_ms}.txt")
+    """
+    Location of a chunk in the legacy per-file cache. Only read from (and cleaned up),
+    so the directory is never created here.
+    """
+    return os.path.join(CACHE_DIR, os.path.basename(video_file), f"{start_ms}_{end_ms}.txt")
 
+# Pure string/number formatters hit with the same values over and over (every
+# context line and emitted subtitle), so they are memoized.
+@lru_cache(maxsize=1 << 16)
 def parse_time_to_ms(ts_str: str) -> float:
     ts_str = ts_str.strip().replace(',', '.').replace('s', '')
     parts = ts_str.split(':')
@@ -40,66 +81,60 @@ def parse_time_to_ms(ts_str: str) -> float:
     else:
         return float(ts_str) * 1000
 
+@lru_cache(maxsize=1 << 16)
 def ms_to_mm_ss_mmm(ms: float | int) -> str:
-    total_seconds = ms / 1000.0
-    m = int(total_seconds // 60)
-    s = total_seconds % 60
-    return f"{m:02}:{s:06.3f}".replace('.', ',')
+    m, ms_r = divmod(round(ms), 60_000)
+    s, ms_r = divmod(ms_r, 1000)
+    return f"{m:02}:{s:02},{ms_r:03}"
 
+@lru_cache(maxsize=1 << 16)
 def ms_to_srt_time(ms: float | int) -> str:
-    td = timedelta(milliseconds=ms)
-    total_seconds = int(td.total_seconds())
-    return f"{total_seconds // 3600:02}:{(total_seconds % 3600) // 60:02}:{total_seconds % 60:02},{int(ms % 1000):03}"
+    s, ms_r = divmod(int(ms), 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02}:{m:02}:{s:02},{ms_r:03}"
 
 def remove_japanese_spaces(text: str | None) -> str | None:
-    if not text:
+    # Every match needs a Japanese character (all at or above U+3000) on one side, so
+    # text without any is returned as-is after a single C-level scan
+    if not text or max(text) < '\u3000':
         return text
-    jp_range = r'[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff\u3000-\u303f\uff00-\uffef]'
-    text = re.sub(rf'(?<={jp_range})\s+(?={jp_range})', '', text)
-    punct = r'[!?.,:;]'
-    text = re.sub(rf'(?<={jp_range})\s+(?={punct})', '', text)
-    text = re.sub(rf'(?<={punct})\s+(?={jp_range})', '', text)
-    return text
+    return _JP_SPACE.sub('', text)
 
 def parse_timestamps(text: str, offset_ms: float | int) -> list[SubtitleEvent]:
     results: list[SubtitleEvent] = []
-    for line in text.splitlines():
-        line = line.strip().replace('`', '')
-        if not line: continue
-        match = re.search(r"(\d+[:\d\.,]*)\s*-\s*(\d+[:\d\.,]*)", line)
-        if match:
-            start_str, end_str = match.groups()
-            content = line[match.end():].strip().lstrip(']: ')
-            try:
-                start_ms = parse_time_to_ms(start_str) + offset_ms
-                end_ms = parse_time_to_ms(end_str) + offset_ms
-                if content:
-                    content = remove_japanese_spaces(content)
-                    if content:
-                        results.append({'start': start_ms, 'end': end_ms, 'text': content})
-            except: pass
+    append = results.append
+    to_ms = parse_time_to_ms
+    clean = remove_japanese_spaces
+    for start_str, end_str, content in _TS_LINE.findall(text.replace('`', '')):
+        content = clean(content)
+        if content:
+            # _TS_LINE only matches well-formed timestamps, so these cannot fail
+            append(SubtitleEvent(to_ms(start_str) + offset_ms, to_ms(end_str) + offset_ms, content))
     return results
 
 def validate_chunk(subs: list[SubtitleEvent]) -> bool:
+    max_duration_ms = MAX_SUBTITLE_DURATION_S * 1000
+    cps_max = CPS_THRESHOLD_MAX
+    cps_min = CPS_THRESHOLD_MIN
     for sub in subs:
-        duration_s = (sub['end'] - sub['start']) / 1000.0
-        if duration_s <= 0:
-            logger.warning(f"Validation failed: Zero or negative duration for '{sub['text']}'")
+        duration_ms = sub.end - sub.start
+        if duration_ms <= 0:
+            logger.warning("Validation failed: Zero or negative duration for '%s'", sub.text)
             return False
         
-        if duration_s > MAX_SUBTITLE_DURATION_S:
-            logger.warning(f"Validation failed: Duration {duration_s:.2f}s exceeds limit {MAX_SUBTITLE_DURATION_S}s for '{sub['text']}'")
+        if duration_ms > max_duration_ms:
+            logger.warning("Validation failed: Duration %.2fs exceeds limit %ss for '%s'", duration_ms / 1000.0, MAX_SUBTITLE_DURATION_S, sub.text)
             return False
 
-        text_len = len(sub['text'])
-        cps = text_len / duration_s
+        cps = len(sub.text) * 1000.0 / duration_ms
         
-        if cps > CPS_THRESHOLD_MAX:
-            logger.warning(f"Validation failed: High CPS ({cps:.2f}) for '{sub['text']}' ({duration_s:.3f}s)")
+        if cps > cps_max:
+            logger.warning("Validation failed: High CPS (%.2f) for '%s' (%.3fs)", cps, sub.text, duration_ms / 1000.0)
             return False
             
-        if cps < CPS_THRESHOLD_MIN:
-             logger.warning(f"Validation failed: Low CPS ({cps:.2f}) for '{sub['text']}' ({duration_s:.3f}s)")
+        if cps < cps_min:
+             logger.warning("Validation failed: Low CPS (%.2f) for '%s' (%.3fs)", cps, sub.text, duration_ms / 1000.0)
              return False
              
-    return True
\ No newline at end of file
+    return True
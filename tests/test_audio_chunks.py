@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.media_utils import MediaProcessor
+
+class TestExtractAudioChunks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.out = self.tmp.name
+        self.media = MediaProcessor()
+
+    def write_segments(self, *indices: int, listed: tuple[int, ...] = ()) -> None:
+        for i in indices:
+            with open(os.path.join(self.out, f"segment_{i:03d}.m4a"), 'wb') as f:
+                f.write(b"audio")
+        with open(os.path.join(self.out, "segments.txt"), 'w', encoding='utf-8') as f:
+            f.writelines(f"segment_{i:03d}.m4a\n" for i in listed)
+
+    def fake_process(self, returncode: int | None = None, stderr: str = "") -> MagicMock:
+        process = MagicMock()
+        process.poll.return_value = returncode
+        process.returncode = returncode
+        process.stderr.read.return_value = stderr
+        return process
+
+    @patch('src.media_utils.subprocess.Popen')
+    def test_ranges_map_to_segments(self, mock_popen):
+        mock_popen.return_value = self.fake_process()
+        ranges = [(1000, 3000), (5000, 7000), (7000, 9000)]
+
+        chunks = self.media.extract_audio_chunks("video.mkv", 1, ranges, self.out)
+
+        cmd = mock_popen.call_args[0][0]
+        # The pass is windowed to [1000, 9000) and cut points are relative to its start
+        self.assertEqual(cmd[cmd.index("-ss") + 1], "1.000")
+        self.assertEqual(cmd[cmd.index("-t") + 1], "8.000")
+        self.assertEqual(cmd[cmd.index("-segment_times") + 1], "2.000,4.000,6.000")
+        # Segment 1 is the silence between the first two ranges
+        self.assertEqual([os.path.basename(p) for p in chunks.paths], ["segment_000.m4a", "segment_002.m4a", "segment_003.m4a"])
+
+    @patch('src.media_utils.subprocess.Popen')
+    def test_get_waits_for_listing_and_deletes_gap_segments(self, mock_popen):
+        mock_popen.return_value = self.fake_process()
+        chunks = self.media.extract_audio_chunks("video.mkv", 1, [(0, 2000), (5000, 7000)], self.out)
+        self.write_segments(0, 1, listed=(0, 1))
+
+        self.assertEqual(chunks.get(0), os.path.join(self.out, "segment_000.m4a"))
+        self.assertTrue(os.path.exists(os.path.join(self.out, "segment_000.m4a")))
+        self.assertFalse(os.path.exists(os.path.join(self.out, "segment_001.m4a")))
+
+    @patch('src.media_utils.subprocess.Popen')
+    def test_ffmpeg_failure_raises(self, mock_popen):
+        mock_popen.return_value = self.fake_process(returncode=1, stderr="boom\n")
+        chunks = self.media.extract_audio_chunks("video.mkv", 1, [(0, 2000), (5000, 7000)], self.out)
+        self.write_segments(0, listed=(0,))
+
+        self.assertEqual(chunks.get(0), os.path.join(self.out, "segment_000.m4a"))
+        with self.assertRaisesRegex(RuntimeError, "code 1 before writing segment_002.m4a: boom"):
+            chunks.get(1, poll_interval=0)
+
+    @patch('src.media_utils.subprocess.Popen')
+    def test_overlapping_ranges_fall_back_to_per_chunk_cuts(self, mock_popen):
+        with patch.object(self.media, 'extract_audio_chunk') as mock_extract:
+            chunks = self.media.extract_audio_chunks("video.mkv", 1, [(0, 3000), (2000, 5000)], self.out, "aac", 2)
+
+        mock_popen.assert_not_called()
+        self.assertEqual(mock_extract.call_count, 2)
+        mock_extract.assert_any_call("video.mkv", 1, 2000, 5000, os.path.join(self.out, "chunk_1.m4a"), "aac", 2)
+        self.assertEqual(chunks.get(1), os.path.join(self.out, "chunk_1.m4a"))
+
+if __name__ == '__main__':
+    unittest.main()
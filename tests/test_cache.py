@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cache import TranscriptionCache
+from src.utils import SubtitleEvent
+
+class TestTranscriptionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.video = os.path.join(self.tmp.name, "video.mkv")
+        with open(self.video, 'wb') as f:
+            f.write(b"\x00" * 4096)
+        self.db_path = Path(self.tmp.name) / "cache.db"
+
+        # Keep legacy .txt lookups inside the temp dir
+        self.legacy_dir = os.path.join(self.tmp.name, "legacy")
+        patcher = patch('src.cache.get_cache_path', side_effect=lambda video, start, end: os.path.join(self.legacy_dir, f"{start}_{end}.txt"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_cache(self, **kwargs) -> TranscriptionCache:
+        cache = TranscriptionCache(self.video, "model", db_path=self.db_path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_round_trip(self):
+        cache = self.open_cache()
+        self.assertIsNone(cache.get(0, 1000))
+
+        events = [SubtitleEvent(100, 900, "はい")]
+        cache.put(0, 1000, "raw", events)
+        self.assertEqual(cache.get(0, 1000), ("raw", events))
+
+        # A fresh instance reads the entry back from sqlite, not the in-memory layer
+        self.assertEqual(self.open_cache().get(0, 1000), ("raw", events))
+
+        cache.delete(0, 1000)
+        self.assertIsNone(cache.get(0, 1000))
+        self.assertIsNone(self.open_cache().get(0, 1000))
+
+    def test_entries_are_per_model(self):
+        self.open_cache().put(0, 1000, "raw")
+        other = TranscriptionCache(self.video, "other-model", db_path=self.db_path)
+        self.addCleanup(other.close)
+        self.assertIsNone(other.get(0, 1000))
+
+    def test_has(self):
+        cache = self.open_cache()
+        self.assertFalse(cache.has(0, 1000))
+        cache.put(0, 1000, "raw")
+        self.assertTrue(cache.has(0, 1000))
+        self.assertTrue(self.open_cache().has(0, 1000))
+        self.assertFalse(cache.has(0, 2000))
+
+    def test_memory_layer_evicts_least_recently_used(self):
+        cache = self.open_cache(memory_size=2)
+        cache.put(0, 1, "a")
+        cache.put(1, 2, "b")
+        cache.get(0, 1)
+        cache.put(2, 3, "c")
+
+        self.assertEqual(len(cache._memory), 2)
+        self.assertIn(cache._key(0, 1), cache._memory)
+        self.assertNotIn(cache._key(1, 2), cache._memory)
+        # Evicted entries are still served from sqlite
+        self.assertEqual(cache.get(1, 2), ("b", None))
+
+    def test_imports_legacy_txt(self):
+        os.makedirs(self.legacy_dir)
+        with open(os.path.join(self.legacy_dir, "0_1000.txt"), 'w', encoding='utf-8') as f:
+            f.write("[00:00,100 - 00:00,900] はい")
+
+        cache = self.open_cache()
+        self.assertTrue(cache.has(0, 1000))
+        self.assertEqual(cache.get(0, 1000), ("[00:00,100 - 00:00,900] はい", None))
+
+        # Once imported, the entry lives in sqlite
+        os.remove(os.path.join(self.legacy_dir, "0_1000.txt"))
+        self.assertEqual(self.open_cache().get(0, 1000), ("[00:00,100 - 00:00,900] はい", None))
+
+if __name__ == '__main__':
+    unittest.main()
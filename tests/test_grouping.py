@@ -0,0 +1,40 @@
+import unittest
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.media_utils import split_if_oversize
+from src.utils import SubtitleEvent
+
+class TestClusterSplitting(unittest.TestCase):
+    def test_small_cluster_untouched(self):
+        cluster = [SubtitleEvent(0, 1000, 'hi')]
+        self.assertEqual(split_if_oversize(cluster), [cluster])
+
+    def test_splits_at_largest_gap(self):
+        cluster = [
+            SubtitleEvent(0, 1000, 'a' * 90),
+            SubtitleEvent(1500, 2000, 'b' * 90),
+            SubtitleEvent(9000, 9500, 'c' * 90),
+            SubtitleEvent(9600, 9900, 'd' * 90),
+        ]
+        parts = split_if_oversize(cluster, max_tokens=150)
+        self.assertEqual(parts, [cluster[:2], cluster[2:]])
+
+    def test_never_splits_inside_audio_padding(self):
+        # Every gap is narrower than the padding on both sides, so the halves' audio would overlap
+        cluster = [SubtitleEvent(i * 1500, i * 1500 + 1000, 'x' * 90) for i in range(4)]
+        self.assertEqual(split_if_oversize(cluster, max_tokens=150, min_gap_ms=1400), [cluster])
+
+    def test_min_gap_applies_to_nested_splits(self):
+        # Only the 13000ms gap clears the caller's threshold; the inner 2000ms gaps would
+        # clear the default one, so each half must stay whole
+        left = [SubtitleEvent(i * 3000, i * 3000 + 1000, 'x' * 90) for i in range(3)]
+        right = [SubtitleEvent(20_000 + i * 3000, 21_000 + i * 3000, 'y' * 90) for i in range(3)]
+        cluster = left + right
+        self.assertEqual(split_if_oversize(cluster, max_tokens=150, min_gap_ms=3000), [left, right])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,13 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 import sys
+import threading
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.core import SubtitleJob
+from src.utils import SubtitleEvent
 
 class TestRetryLogic(unittest.TestCase):
     def setUp(self):
@@ -14,16 +16,17 @@ class TestRetryLogic(unittest.TestCase):
         self.output_path = "dummy.srt"
 
     @patch('src.core.tempfile.mkdtemp')
+    @patch('src.core.TranscriptionCache')
     @patch('src.core.Transcriber')
     @patch('src.core.MediaProcessor')
-    @patch('src.core.get_dialogue_from_ass')
+    @patch('src.core.get_dialogue_from_ass_text')
     @patch('src.core.group_events')
     @patch('src.core.os.makedirs')
     @patch('src.core.shutil.rmtree')
     @patch('src.core.os.remove')
     @patch('src.core.os.path.exists')
     @patch('builtins.open', new_callable=unittest.mock.mock_open)
-    def test_transcription_exception_stops_processing(self, mock_open, mock_exists, mock_remove, mock_rmtree, mock_makedirs, mock_group_events, mock_get_dialogue, MockMedia, MockTranscriber, mock_mkdtemp):
+    def test_transcription_exception_stops_processing(self, mock_open, mock_exists, mock_remove, mock_rmtree, mock_makedirs, mock_group_events, mock_get_dialogue, MockMedia, MockTranscriber, MockCache, mock_mkdtemp):
         
         # Setup mocks
         mock_mkdtemp.return_value = "/tmp/dummy"
@@ -31,10 +34,12 @@ class TestRetryLogic(unittest.TestCase):
         mock_media_instance.get_best_subtitle_track.return_value = {'index': 0, 'score': 100}
         mock_media_instance.get_best_audio_track.return_value = {'index': 1, 'score': 100}
         
-        mock_get_dialogue.return_value = [{'start': 0, 'end': 1000, 'text': 'test'}]
+        mock_get_dialogue.return_value = [SubtitleEvent(0, 1000, 'test')]
         # Return 2 clusters
-        mock_group_events.return_value = [[{'start': 0, 'end': 1000, 'text': 'test'}], [{'start': 2000, 'end': 3000, 'text': 'test2'}]]
-        mock_exists.return_value = False # Cache does not exist
+        mock_group_events.return_value = [[SubtitleEvent(0, 1000, 'test')], [SubtitleEvent(2000, 3000, 'test2')]]
+        mock_exists.return_value = False
+        MockCache.return_value.get.return_value = None # Cache does not exist
+        MockCache.return_value.has.return_value = False
         
         # Setup Transcriber mock to raise Exception
         mock_transcriber_instance = MockTranscriber.return_value
@@ -50,9 +55,10 @@ class TestRetryLogic(unittest.TestCase):
         self.assertTrue(job.stop_requested)
         
     @patch('src.core.tempfile.mkdtemp')
+    @patch('src.core.TranscriptionCache')
     @patch('src.core.Transcriber')
     @patch('src.core.MediaProcessor')
-    @patch('src.core.get_dialogue_from_ass')
+    @patch('src.core.get_dialogue_from_ass_text')
     @patch('src.core.group_events')
     @patch('src.core.os.makedirs')
     @patch('src.core.shutil.rmtree')
@@ -61,21 +67,23 @@ class TestRetryLogic(unittest.TestCase):
     @patch('src.core.os.remove')
     @patch('src.core.os.path.exists')
     @patch('builtins.open', new_callable=unittest.mock.mock_open)
-    def test_validation_failure_retries(self, mock_open, mock_exists, mock_remove, mock_parse, mock_validate, mock_rmtree, mock_makedirs, mock_group_events, mock_get_dialogue, MockMedia, MockTranscriber, mock_mkdtemp):
+    def test_validation_failure_retries(self, mock_open, mock_exists, mock_remove, mock_parse, mock_validate, mock_rmtree, mock_makedirs, mock_group_events, mock_get_dialogue, MockMedia, MockTranscriber, MockCache, mock_mkdtemp):
         # Setup mocks
         mock_mkdtemp.return_value = "/tmp/dummy"
         mock_media_instance = MockMedia.return_value
         mock_media_instance.get_best_subtitle_track.return_value = {'index': 0, 'score': 100}
         mock_media_instance.get_best_audio_track.return_value = {'index': 1, 'score': 100}
         
-        mock_get_dialogue.return_value = [{'start': 0, 'end': 1000, 'text': 'test'}]
-        mock_group_events.return_value = [[{'start': 0, 'end': 1000, 'text': 'test'}]]
-        mock_exists.return_value = False # Cache does not exist
+        mock_get_dialogue.return_value = [SubtitleEvent(0, 1000, 'test')]
+        mock_group_events.return_value = [[SubtitleEvent(0, 1000, 'test')]]
+        mock_exists.return_value = False
+        MockCache.return_value.get.return_value = None # Cache does not exist
+        MockCache.return_value.has.return_value = False
         
         mock_transcriber_instance = MockTranscriber.return_value
         mock_transcriber_instance.transcribe_chunk.return_value = "raw text"
         
-        mock_parse.return_value = [{'start': 0, 'end': 1000, 'text': 'parsed'}]
+        mock_parse.return_value = [SubtitleEvent(0, 1000, 'parsed')]
         mock_validate.return_value = False # Fail validation
              
         job = SubtitleJob(self.video_file, output_path=self.output_path)
@@ -84,5 +92,52 @@ class TestRetryLogic(unittest.TestCase):
         # Should have retried 3 times (MAX_RETRIES)
         self.assertEqual(mock_transcriber_instance.transcribe_chunk.call_count, 3)
 
+    @patch('src.core.tempfile.mkdtemp')
+    @patch('src.core.TranscriptionCache')
+    @patch('src.core.Transcriber')
+    @patch('src.core.MediaProcessor')
+    @patch('src.core.get_dialogue_from_ass_text')
+    @patch('src.core.group_events')
+    @patch('src.core.as_completed')
+    @patch('src.core.os.makedirs')
+    @patch('src.core.shutil.rmtree')
+    @patch('src.core.os.remove')
+    @patch('src.core.os.path.exists')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_keyboard_interrupt_cancels_queued_chunks(self, mock_open, mock_exists, mock_remove, mock_rmtree, mock_makedirs, mock_as_completed, mock_group_events, mock_get_dialogue, MockMedia, MockTranscriber, MockCache, mock_mkdtemp):
+        mock_mkdtemp.return_value = "/tmp/dummy"
+        mock_media_instance = MockMedia.return_value
+        mock_media_instance.get_best_subtitle_track.return_value = {'index': 0, 'score': 100}
+        mock_media_instance.get_best_audio_track.return_value = {'index': 1, 'score': 100}
+
+        mock_get_dialogue.return_value = [SubtitleEvent(0, 1000, 'test')]
+        mock_group_events.return_value = [[SubtitleEvent(i * 10_000, i * 10_000 + 1000, f'test{i}')] for i in range(5)]
+        mock_exists.return_value = False
+        MockCache.return_value.get.return_value = None
+        MockCache.return_value.has.return_value = False
+
+        job = SubtitleJob(self.video_file, output_path=self.output_path, workers=1)
+
+        # The first chunk stays in flight until the job is stopped; the rest sit in the queue
+        started = threading.Event()
+        def transcribe(*args, **kwargs):
+            started.set()
+            job.stop_event.wait(5)
+            return "raw text"
+        mock_transcriber_instance = MockTranscriber.return_value
+        mock_transcriber_instance.transcribe_chunk.side_effect = transcribe
+
+        # Ctrl+C lands while the main thread waits for results
+        def interrupt(futures):
+            started.wait(5)
+            raise KeyboardInterrupt
+        mock_as_completed.side_effect = interrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            job.run()
+
+        self.assertTrue(job.stop_requested)
+        self.assertEqual(mock_transcriber_instance.transcribe_chunk.call_count, 1)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
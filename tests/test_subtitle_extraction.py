@@ -29,7 +29,7 @@ class TestSubtitleRegression(unittest.TestCase):
                     expected_lines = [line.strip() for line in f if line.strip()]
                 
                 # Format actual output
-                actual_lines = [f"[{e['start']}ms - {e['end']}ms] {e['text']}" for e in events]
+                actual_lines = [f"[{e.start}ms - {e.end}ms] {e.text}" for e in events]
                 
                 # Check line count
                 self.assertEqual(len(actual_lines), len(expected_lines), 
@@ -0,0 +1,72 @@
+import unittest
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.throttle import AIMDController, RateLimiter
+
+class TestAIMDController(unittest.TestCase):
+    def test_additive_increase_is_clamped(self):
+        controller = AIMDController(min_limit=1, max_limit=3, increase=0.5, warmup=100)
+        for _ in range(10):
+            controller.acquire()
+            controller.release(latency=1.0)
+        self.assertEqual(controller.limit, 3.0)
+
+    def test_throttle_halves_limit(self):
+        controller = AIMDController(min_limit=1, max_limit=8, increase=1.0, decrease=0.5, warmup=100)
+        for _ in range(5):
+            controller.acquire()
+            controller.release(latency=1.0)
+        self.assertEqual(controller.limit, 6.0)
+
+        controller.acquire()
+        controller.release(throttled=True)
+        self.assertEqual(controller.limit, 3.0)
+
+    def test_record_throttle_decreases_limit_mid_request(self):
+        controller = AIMDController(min_limit=1, max_limit=8, increase=1.0, decrease=0.5, warmup=100)
+        for _ in range(3):
+            controller.acquire()
+            controller.release(latency=1.0)
+        controller.acquire()
+        controller.record_throttle()
+        self.assertEqual(controller.limit, 2.0)
+        controller.release(latency=1.0)
+
+    def test_latency_inflation_decreases_limit(self):
+        controller = AIMDController(min_limit=1, max_limit=8, increase=1.0, decrease=0.5, window=3, warmup=3, tolerance=2.0)
+        for _ in range(3):
+            controller.acquire()
+            controller.release(latency=1.0)
+        self.assertEqual(controller.target_latency, 1.0)
+        self.assertEqual(controller.limit, 4.0)
+
+        # A single slow request does not move the median; a sustained slowdown does
+        controller.acquire()
+        controller.release(latency=10.0)
+        self.assertEqual(controller.limit, 5.0)
+        controller.acquire()
+        controller.release(latency=10.0)
+        self.assertEqual(controller.limit, 2.5)
+
+class TestRateLimiter(unittest.TestCase):
+    def test_waits_for_window_when_rpm_exhausted(self):
+        limiter = RateLimiter(rpm=2, tpm=1_000_000, window=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait_if_throttled(100)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_waits_for_window_when_tpm_exhausted(self):
+        limiter = RateLimiter(rpm=100, tpm=1000, window=0.2)
+        start = time.monotonic()
+        limiter.wait_if_throttled(600)
+        limiter.wait_if_throttled(600)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from google.genai import errors
+from src.transcriber import Transcriber
+
+class TestGenerateWithBackoff(unittest.TestCase):
+    def setUp(self):
+        self.transcriber = Transcriber.__new__(Transcriber)
+        self.client = MagicMock()
+        patcher = patch('src.transcriber.get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.transcriber.time.sleep')
+    @patch('src.transcriber.rate_limiter')
+    @patch('src.transcriber.generation_config')
+    def test_retried_errors_are_reported(self, mock_config, mock_limiter, mock_sleep):
+        overloaded = errors.ServerError(503, {'error': {'code': 503, 'message': 'overloaded', 'status': 'UNAVAILABLE'}})
+        response = MagicMock()
+        self.client.models.generate_content.side_effect = [overloaded, response]
+        on_throttle = MagicMock()
+
+        result = self.transcriber._generate_with_backoff("model", [], 100, on_throttle)
+
+        self.assertIs(result, response)
+        on_throttle.assert_called_once_with()
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    @patch('src.transcriber.time.sleep')
+    @patch('src.transcriber.rate_limiter')
+    @patch('src.transcriber.generation_config')
+    def test_latency_excludes_limiter_wait(self, mock_config, mock_limiter, mock_sleep):
+        # The limiter wait advances the clock by 60s; only the 2.5s call should be timed
+        clock = [0.0]
+        def advance(seconds):
+            clock[0] += seconds
+        mock_limiter.wait_if_throttled.side_effect = lambda tokens: advance(60.0)
+        self.client.models.generate_content.side_effect = lambda **kwargs: advance(2.5)
+        on_latency = MagicMock()
+        with patch('src.transcriber.time.monotonic', side_effect=lambda: clock[0]):
+            self.transcriber._generate_with_backoff("model", [], 100, on_latency=on_latency)
+        on_latency.assert_called_once_with(2.5)
+
+if __name__ == '__main__':
+    unittest.main()
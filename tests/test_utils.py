@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import ms_to_srt_time, ms_to_mm_ss_mmm, parse_timestamps, remove_japanese_spaces, SubtitleEvent
+
+class TestTimeFormatting(unittest.TestCase):
+    def test_ms_to_srt_time(self):
+        self.assertEqual(ms_to_srt_time(0), "00:00:00,000")
+        self.assertEqual(ms_to_srt_time(1234.9), "00:00:01,234")
+        self.assertEqual(ms_to_srt_time(61_005), "00:01:01,005")
+        self.assertEqual(ms_to_srt_time(3_723_456), "01:02:03,456")
+
+    def test_ms_to_mm_ss_mmm(self):
+        self.assertEqual(ms_to_mm_ss_mmm(0), "00:00,000")
+        self.assertEqual(ms_to_mm_ss_mmm(1250.4), "00:01,250")
+        self.assertEqual(ms_to_mm_ss_mmm(61_005), "01:01,005")
+        self.assertEqual(ms_to_mm_ss_mmm(59_999.9), "01:00,000")
+
+class TestParseTimestamps(unittest.TestCase):
+    def test_parse_timestamps(self):
+        text = "```\n[00:01,250 - 00:03,100] こんにちは\nnoise\n[00:04,000 - 00:05,500]: 元気 です か\n[00:06,000 - 00:07,000]\n```"
+        self.assertEqual(parse_timestamps(text, 1000), [
+            SubtitleEvent(2250, 4100, 'こんにちは'),
+            SubtitleEvent(5000, 6500, '元気ですか'),
+        ])
+
+    def test_parse_timestamps_skips_malformed(self):
+        text = "[1:2:3:4 - 00:05,000] 壊れた\n[00:01,000 - 00:02,000] はい"
+        self.assertEqual(parse_timestamps(text, 0), [SubtitleEvent(1000, 2000, 'はい')])
+
+class TestRemoveJapaneseSpaces(unittest.TestCase):
+    def test_remove_japanese_spaces(self):
+        self.assertEqual(remove_japanese_spaces("元気 です か ?  はい"), "元気ですか?はい")
+        self.assertEqual(remove_japanese_spaces("OK, 行こう"), "OK,行こう")
+        self.assertEqual(remove_japanese_spaces("Hello, world !"), "Hello, world !")
+        self.assertEqual(remove_japanese_spaces(""), "")
+
+if __name__ == '__main__':
+    unittest.main()